@@ -0,0 +1,204 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from Crypto.Cipher import AES
+from Crypto.Hash import BLAKE2s
+from Crypto.Random import get_random_bytes
+
+# Multi-core AES-CTR / AES-GCM for large buffers.
+#
+# CTR keystream blocks are independent, so the buffer is cut into segments
+# of whole 16-byte counter blocks and segment i starts its own CTR context
+# at counter initial_value + offset // 16. PyCryptodome drops the GIL in
+# its C code, so the segments run in parallel on a thread pool, each one
+# writing straight into its slice of a single preallocated output buffer.
+# The result is byte-identical to one single-threaded CTR pass.
+#
+# GCM is CTR plus a GHASH over the ciphertext. The CTR part is done as
+# above (12-byte nonce, counter starting at 2, as in SP 800-38D) and GHASH
+# is fed each segment in order as soon as it is finished. GHASH comes from
+# PyCryptodome's GCM module. That API is private, so on import it is checked
+# against the public AES.MODE_GCM; if it is missing or doesn't match we
+# fall back to the regular single-threaded AES.MODE_GCM.
+
+SEGMENT_SIZE = 1 << 20
+
+try:
+    from Crypto.Cipher._mode_gcm import _GHASH, _ghash_clmul, _ghash_portable
+    _ghash_c = _ghash_clmul or _ghash_portable
+except ImportError:
+    _GHASH = None
+
+
+def _segments(length, segment_size):
+    segment_size = max(AES.block_size, segment_size - segment_size % AES.block_size)
+    return [(start, min(start + segment_size, length)) for start in range(0, length, segment_size)]
+
+
+def _ctr_into(data, out, key, nonce, initial_value, workers, segment_size, on_segment=None):
+    """Parallel CTR of data into out; on_segment(start, end) is called in order"""
+    src, dst = memoryview(data), memoryview(out)
+    if len(dst) != len(src):
+        raise ValueError('output buffer must be the same size as the input')
+
+    def work(segment):
+        start, end = segment
+        ctx = AES.new(key, AES.MODE_CTR, nonce=nonce, initial_value=initial_value + start // AES.block_size)
+        ctx.encrypt(src[start:end], output=dst[start:end])
+        return segment
+
+    segments = _segments(len(src), segment_size)
+    if len(segments) <= 1 or workers == 1:
+        for segment in map(work, segments):
+            if on_segment:
+                on_segment(*segment)
+        return out
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for segment in executor.map(work, segments):
+            if on_segment:
+                on_segment(*segment)
+    return out
+
+
+# ---------- CTR ----------
+
+def ctr_encrypt(data, key, nonce=None, initial_value=0, workers=None, segment_size=SEGMENT_SIZE, out=None):
+    """AES-CTR over a bytes-like buffer; returns (nonce, ciphertext)
+
+    nonce defaults to 8 random bytes (PyCryptodome's CTR default), leaving
+    a 64-bit block counter. Pass a writable `out` of the same length to
+    avoid allocating the result.
+    """
+    nonce = get_random_bytes(8) if nonce is None else nonce
+    out = bytearray(len(data)) if out is None else out
+    return nonce, _ctr_into(data, out, key, nonce, initial_value, workers, segment_size)
+
+def ctr_decrypt(data, key, nonce, initial_value=0, workers=None, segment_size=SEGMENT_SIZE, out=None):
+    out = bytearray(len(data)) if out is None else out
+    return _ctr_into(data, out, key, nonce, initial_value, workers, segment_size)
+
+
+# ---------- GCM ----------
+
+def _gcm_parts(key, nonce):
+    """(GHASH state, tag mask E(J0)) for a 12-byte nonce"""
+    j0 = nonce + b'\x00\x00\x00\x01'
+    ecb = AES.new(key, AES.MODE_ECB)
+    return _GHASH(ecb.encrypt(b'\x00' * 16), _ghash_c), ecb.encrypt(j0)
+
+def _gcm_tag(signer, mask, aad, ct_len):
+    lengths = (8 * len(aad)).to_bytes(8, 'big') + (8 * ct_len).to_bytes(8, 'big')
+    signer.update(lengths)
+    return bytes(a ^ b for a, b in zip(signer.digest(), mask))
+
+def _ghash_feed(signer, buf, start, end):
+    block = buf[start:end]
+    if len(block) % 16:
+        block = bytes(block) + b'\x00' * (16 - len(block) % 16)  # only the final segment
+    signer.update(block)
+
+def _ghash_aad(signer, aad):
+    if aad:
+        signer.update(aad + b'\x00' * (-len(aad) % 16))
+
+def gcm_encrypt(data, key, nonce=None, aad=b'', workers=None, segment_size=SEGMENT_SIZE, out=None):
+    """AES-GCM over a bytes-like buffer; returns (nonce, ciphertext, tag)
+
+    Identical to AES.new(key, AES.MODE_GCM, nonce=nonce) with the AAD,
+    encrypt_and_digest(data).
+    """
+    nonce = get_random_bytes(12) if nonce is None else nonce
+    if _GHASH is None or len(nonce) != 12:
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(aad)
+        return (nonce,) + cipher.encrypt_and_digest(data)
+
+    out = bytearray(len(data)) if out is None else out
+    signer, mask = _gcm_parts(key, nonce)
+    _ghash_aad(signer, aad)
+    view = memoryview(out)
+    _ctr_into(data, out, key, nonce, 2, workers, segment_size,
+              on_segment=lambda start, end: _ghash_feed(signer, view, start, end))
+    return nonce, out, _gcm_tag(signer, mask, aad, len(out))
+
+def gcm_decrypt(data, key, nonce, tag, aad=b'', workers=None, segment_size=SEGMENT_SIZE, out=None):
+    """Checks the tag first, then decrypts; raises ValueError on a bad tag"""
+    if _GHASH is None or len(nonce) != 12:
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(aad)
+        return cipher.decrypt_and_verify(data, tag)
+
+    signer, mask = _gcm_parts(key, nonce)
+    _ghash_aad(signer, aad)
+    view = memoryview(data)
+    for start, end in _segments(len(view), segment_size):
+        _ghash_feed(signer, view, start, end)
+    # Constant-time compare, the same way PyCryptodome verifies MACs
+    expected = _gcm_tag(signer, mask, aad, len(view))
+    secret = get_random_bytes(16)
+    if BLAKE2s.new(digest_bits=160, key=secret, data=expected).digest() != \
+            BLAKE2s.new(digest_bits=160, key=secret, data=tag).digest():
+        raise ValueError("MAC check failed")
+    out = bytearray(len(data)) if out is None else out
+    return _ctr_into(data, out, key, nonce, 2, workers, segment_size)
+
+
+def _ghash_matches_public_gcm():
+    # Several segments, a partial last block and AAD, against MODE_GCM
+    key, nonce, aad, data = bytes(range(16)), bytes(range(12)), b'header', bytes(range(100))
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(aad)
+    expected = cipher.encrypt_and_digest(data)
+    try:
+        _, ct, tag = gcm_encrypt(data, key, nonce, aad, workers=1, segment_size=32)
+        return (bytes(ct), tag) == expected and bytes(gcm_decrypt(ct, key, nonce, tag, aad, workers=1)) == data
+    except Exception:
+        return False
+
+if _GHASH is not None and not _ghash_matches_public_gcm():
+    _GHASH = None
+
+
+# ---------- Benchmark ----------
+
+def main():
+    from time import perf_counter
+
+    size = 256 << 20
+    data = os.urandom(size)
+    key = os.urandom(32)
+    nonce = os.urandom(8)
+    out = bytearray(size)
+
+    start = perf_counter()
+    expected = AES.new(key, AES.MODE_CTR, nonce=nonce).encrypt(data)
+    single = size / (perf_counter() - start) / 1e6
+
+    gcm_nonce = os.urandom(12)
+    start = perf_counter()
+    gcm_ct, gcm_tag = AES.new(key, AES.MODE_GCM, nonce=gcm_nonce).encrypt_and_digest(data)
+    gcm_single = size / (perf_counter() - start) / 1e6
+
+    cores = os.cpu_count() or 1
+    print(f"{size >> 20} MB, AES-256, {cores} cores")
+    print(f"{'Workers':<8} {'CTR MB/s':<10} {'Speedup':<8} {'GCM MB/s':<10} {'Speedup':<8}")
+    print(f"{'single':<8} {single:<10.0f} {1.0:<8.2f} {gcm_single:<10.0f} {1.0:<8.2f}")
+    workers = 1
+    while True:
+        start = perf_counter()
+        ctr_encrypt(data, key, nonce=nonce, workers=workers, out=out)
+        ctr_rate = size / (perf_counter() - start) / 1e6
+        assert out == expected, "parallel CTR mismatch!"
+
+        start = perf_counter()
+        _, ct, tag = gcm_encrypt(data, key, nonce=gcm_nonce, workers=workers, out=out)
+        gcm_rate = size / (perf_counter() - start) / 1e6
+        assert ct == gcm_ct and tag == gcm_tag, "parallel GCM mismatch!"
+        print(f"{workers:<8} {ctr_rate:<10.0f} {ctr_rate / single:<8.2f} "
+              f"{gcm_rate:<10.0f} {gcm_rate / gcm_single:<8.2f}")
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)
+
+if __name__ == "__main__":
+    main()
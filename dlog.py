@@ -0,0 +1,167 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from math import isqrt
+
+from numtheory import mpz, powmod
+
+# Baby-step/giant-step discrete logs for exponential ElGamal.
+#
+# Decrypting exponential ElGamal yields g^m, and m is recovered by solving
+# g^m = y for 0 <= m < max_value. With B baby steps the table holds g^j for
+# 0 <= j < B; a search walks y, y*g^-B, y*g^-2B, ... until one of them is
+# in the table, so at most ceil(max_value / B) multiplications and lookups.
+#
+# The table is an open-addressing hash table of fixed-size entries
+#   fingerprint (low 64 bits of g^j, 8 bytes) | j + 1 (4 bytes, 0 = empty)
+# stored after a header in a file, and memory-mapped read-only, so every
+# process shares one copy through the page cache instead of rebuilding it.
+# Fingerprint matches are confirmed with one exponentiation.
+
+MAGIC = b'ISDL\x01'
+_HEADER = struct.Struct('>5s32sQQ')  # magic, key id, baby steps, slots
+_ENTRY = struct.Struct('<QI')
+_FP_MASK = (1 << 64) - 1
+
+
+def _key_id(p, g):
+    return hashlib.sha256(f'{p}:{g}'.encode()).digest()
+
+
+class DiscreteLogTable:
+    """Solves g^m = y (mod p) for 0 <= m < max_value.
+
+    With `path` the table is loaded from that file if it was built for the
+    same (p, g, baby_steps), otherwise built and saved there; without it
+    the table lives in memory. baby_steps defaults to sqrt(max_value).
+    """
+    def __init__(self, p, g, max_value=2 ** 32, baby_steps=None, path=None):
+        self.p = p
+        self.g = g
+        self.max_value = max_value
+        self.baby_steps = baby_steps or isqrt(max_value - 1) + 1
+        self.giant_steps = -(-max_value // self.baby_steps)
+        self.slots = 1 << (2 * self.baby_steps - 1).bit_length()  # load factor <= 1/2
+        self._giant = mpz(powmod(pow(g, -1, p), self.baby_steps, p))  # g^-B
+        self._file = None
+
+        header = _HEADER.pack(MAGIC, _key_id(p, g), self.baby_steps, self.slots)
+        if path is None:
+            self._buf = self._build(header)
+        else:
+            if not self._matches(path, header):
+                self._save(path, self._build(header))
+            self._file = open(path, 'rb')
+            self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._base = _HEADER.size
+
+    @staticmethod
+    def _matches(path, header):
+        try:
+            with open(path, 'rb') as f:
+                return f.read(len(header)) == header
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _save(path, data):
+        # A private temp file per builder, renamed into place atomically, so
+        # concurrent builders never write into each other's file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.dlog.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(tmp, 0o644)  # mkstemp creates it owner-only; the table is public data
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _build(self, header):
+        buf = bytearray(len(header) + self.slots * _ENTRY.size)
+        buf[:len(header)] = header
+        mask, base = self.slots - 1, len(header)
+        p, g, value = mpz(self.p), mpz(self.g), mpz(1)
+        for j in range(self.baby_steps):
+            fp = int(value) & _FP_MASK
+            slot = fp & mask
+            while _ENTRY.unpack_from(buf, base + slot * _ENTRY.size)[1]:
+                slot = (slot + 1) & mask
+            _ENTRY.pack_into(buf, base + slot * _ENTRY.size, fp, j + 1)
+            value = value * g % p
+        return buf
+
+    def nbytes(self):
+        return len(self._buf)
+
+    def _lookup(self, y):
+        """Baby-step indices whose fingerprint matches y"""
+        fp = int(y) & _FP_MASK
+        mask, buf, base = self.slots - 1, self._buf, self._base
+        slot = fp & mask
+        while True:
+            entry_fp, j = _ENTRY.unpack_from(buf, base + slot * _ENTRY.size)
+            if not j:
+                return
+            if entry_fp == fp:
+                yield j - 1
+            slot = (slot + 1) & mask
+
+    def solve(self, y):
+        p, y = mpz(self.p), mpz(y) % self.p
+        target = int(y)
+        for i in range(self.giant_steps):
+            for j in self._lookup(y):
+                m = i * self.baby_steps + j
+                if m < self.max_value and powmod(self.g, m, self.p) == target:
+                    return m
+            y = y * self._giant % p
+        raise ValueError(f'discrete log not in range [0, {self.max_value})')
+
+    def close(self):
+        if self._file is not None:
+            self._buf.close()
+            self._file.close()
+            self._file = None
+
+
+# ---------- Benchmark ----------
+
+def main():
+    import random
+    import tempfile
+    from time import perf_counter
+    from Crypto.Util import number
+
+    p = number.getPrime(256)
+    g = random.randint(2, p - 1)
+    max_value = 2 ** 32
+    values = [random.randrange(max_value) for _ in range(20)]
+    targets = [powmod(g, m, p) for m in values]
+
+    print(f"256-bit p, plaintexts in [0, 2^32), {len(values)} random decryptions")
+    print(f"{'Baby steps':<12} {'Table (MB)':<12} {'Build (s)':<11} {'Load (ms)':<11} "
+          f"{'Mean (ms)':<11} {'Worst (ms)':<11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for log_baby in [12, 14, 16, 18, 20]:
+            path = os.path.join(tmp, f'table{log_baby}.dlog')
+            start = perf_counter()
+            DiscreteLogTable(p, g, max_value, baby_steps=1 << log_baby, path=path).close()
+            build = perf_counter() - start
+
+            start = perf_counter()
+            table = DiscreteLogTable(p, g, max_value, baby_steps=1 << log_baby, path=path)
+            load = perf_counter() - start
+            times = []
+            for m, y in zip(values, targets):
+                start = perf_counter()
+                assert table.solve(y) == m, "discrete log mismatch!"
+                times.append(perf_counter() - start)
+            print(f"{'2^%d' % log_baby:<12} {table.nbytes() / 2 ** 20:<12.2f} {build:<11.2f} {load * 1000:<11.2f} "
+                  f"{sum(times) / len(times) * 1000:<11.1f} {max(times) * 1000:<11.1f}")
+            table.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# ECDSA over SECP256k1 with interchangeable backends.
+#
+# OpenSSL through `cryptography` is used when it is installed, otherwise the
+# pure-Python `ecdsa` package, whose verifying keys get precomputed point
+# tables on first use. Both backends sign SHA-256 digests and use the same
+# encodings -- 64-byte r || s signatures and 65-byte uncompressed public
+# points -- so signatures and keys move freely between them.
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric.utils import (
+        decode_dss_signature, encode_dss_signature)
+    from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+except ImportError:
+    ec = None
+
+try:
+    import ecdsa
+except ImportError:
+    ecdsa = None
+
+SIGNATURE_SIZE = 64
+_HALF = SIGNATURE_SIZE // 2
+
+
+class OpenSSLBackend:
+    name = 'openssl'
+
+    def __init__(self):
+        self._curve = ec.SECP256K1()
+        self._algorithm = ec.ECDSA(hashes.SHA256())
+
+    def generate(self):
+        return ec.generate_private_key(self._curve)
+
+    def public_key(self, sk):
+        return sk.public_key()
+
+    def sign(self, sk, message):
+        r, s = decode_dss_signature(sk.sign(message, self._algorithm))
+        return r.to_bytes(_HALF, 'big') + s.to_bytes(_HALF, 'big')
+
+    def verify(self, vk, message, signature):
+        if len(signature) != SIGNATURE_SIZE:
+            return False
+        der = encode_dss_signature(int.from_bytes(signature[:_HALF], 'big'),
+                                   int.from_bytes(signature[_HALF:], 'big'))
+        try:
+            vk.verify(der, message, self._algorithm)
+            return True
+        except InvalidSignature:
+            return False
+
+    def public_bytes(self, vk):
+        return vk.public_bytes(Encoding.X962, PublicFormat.UncompressedPoint)
+
+    def load_public(self, data):
+        return ec.EllipticCurvePublicKey.from_encoded_point(self._curve, data)
+
+
+class EcdsaBackend:
+    name = 'ecdsa'
+
+    def generate(self):
+        return ecdsa.SigningKey.generate(curve=ecdsa.SECP256k1, hashfunc=hashlib.sha256)
+
+    def public_key(self, sk):
+        return sk.verifying_key
+
+    def sign(self, sk, message):
+        return sk.sign(message, hashfunc=hashlib.sha256, sigencode=ecdsa.util.sigencode_string)
+
+    def verify(self, vk, message, signature):
+        try:
+            return vk.verify(signature, message, hashfunc=hashlib.sha256,
+                             sigdecode=ecdsa.util.sigdecode_string)
+        except (ecdsa.BadSignatureError, ecdsa.MalformedPointError, AssertionError):
+            return False
+
+    def public_bytes(self, vk):
+        return vk.to_string('uncompressed')
+
+    def load_public(self, data):
+        curve = ecdsa.SECP256k1
+        point = ecdsa.VerifyingKey.from_string(data, curve=curve).pubkey.point
+        # Rebuild the point with the group order attached: keys parsed by
+        # from_string lack it, and precompute() then gives wrong results
+        point = ecdsa.ellipticcurve.Point(curve.curve, point.x(), point.y(), curve.order)
+        return ecdsa.VerifyingKey.from_public_point(point, curve=curve, hashfunc=hashlib.sha256)
+
+    def prepare(self, vk):
+        # Point multiplication tables for this key, built once per key
+        vk.precompute(lazy=True)
+
+
+BACKENDS = {}
+if ec is not None:
+    BACKENDS['openssl'] = OpenSSLBackend()
+if ecdsa is not None:
+    BACKENDS['ecdsa'] = EcdsaBackend()
+if not BACKENDS:
+    raise ImportError('ecc needs either the cryptography or the ecdsa package')
+
+BACKEND = next(iter(BACKENDS))
+
+
+def get_backend(name=None):
+    return BACKENDS[name or BACKEND]
+
+
+class PublicKey:
+    def __init__(self, key, backend):
+        self._key = key
+        self.backend = backend
+        prepare = getattr(backend, 'prepare', None)
+        if prepare:
+            prepare(key)
+
+    def verify(self, message, signature):
+        return self.backend.verify(self._key, message, signature)
+
+    def to_bytes(self):
+        """65-byte uncompressed point (0x04 || x || y)"""
+        return self.backend.public_bytes(self._key)
+
+
+class PrivateKey:
+    def __init__(self, key, backend):
+        self._key = key
+        self.backend = backend
+        self.public_key = PublicKey(backend.public_key(key), backend)
+
+    def sign(self, message):
+        """64-byte r || s ECDSA signature over SHA-256(message)"""
+        return self.backend.sign(self._key, message)
+
+
+def generate_keys(backend=None):
+    backend = get_backend(backend)
+    sk = PrivateKey(backend.generate(), backend)
+    return sk, sk.public_key
+
+
+@lru_cache(maxsize=256)
+def load_public_key(data, backend=None):
+    """PublicKey from its encoded point, cached so repeat signers keep their tables"""
+    backend = get_backend(backend)
+    return PublicKey(backend.load_public(bytes(data)), backend)
+
+
+# ---------- Batch helpers ----------
+
+def _run(func, items, workers):
+    if workers == 1 or len(items) < 2:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        return list(executor.map(func, items))
+
+def sign_many(sk, messages, workers=1):
+    return _run(sk.sign, list(messages), workers)
+
+def verify_many(items, workers=1):
+    """items: (public key, message, signature) triples; returns one bool each"""
+    return _run(lambda item: item[0].verify(item[1], item[2]), list(items), workers)
+
+
+# ---------- Benchmark ----------
+
+def main():
+    from time import perf_counter
+
+    count = 500
+    messages = [f"order {i}: 3 x widget, total 59.97".encode() for i in range(count)]
+    print(f"SECP256k1, SHA-256, {count} messages, operations per second (default backend: {BACKEND})")
+    print(f"{'Backend':<9} {'keygen':<10} {'sign':<10} {'verify':<10} {'verify (no tables)':<18}")
+    signed = {}
+    for name, backend in BACKENDS.items():
+        start = perf_counter()
+        keys = [generate_keys(name) for _ in range(20)]
+        keygen = 20 / (perf_counter() - start)
+        sk, vk = keys[0]
+
+        start = perf_counter()
+        signatures = sign_many(sk, messages)
+        sign = count / (perf_counter() - start)
+
+        start = perf_counter()
+        assert all(verify_many((vk, m, s) for m, s in zip(messages, signatures)))
+        verify = count / (perf_counter() - start)
+
+        cold = '-'
+        if name == 'ecdsa':
+            # Same key without precomputed tables, for comparison
+            raw = backend.load_public(vk.to_bytes())
+            start = perf_counter()
+            assert all(backend.verify(raw, m, s) for m, s in zip(messages[:50], signatures[:50]))
+            cold = f"{50 / (perf_counter() - start):,.0f}"
+        signed[name] = (vk.to_bytes(), signatures)
+        print(f"{name:<9} {keygen:<10,.0f} {sign:<10,.0f} {verify:<10,.0f} {cold:<18}")
+
+    # Signatures made by one backend verify under the other
+    for name, (public, signatures) in signed.items():
+        for other in BACKENDS:
+            assert all(load_public_key(public, other).verify(m, s) for m, s in zip(messages, signatures))
+
+if __name__ == "__main__":
+    main()
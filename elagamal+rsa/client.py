@@ -1,24 +1,33 @@
+import os
+import sys
 import socket
 import json
 from Crypto.PublicKey import RSA
 from Crypto.Signature import pkcs1_15
 from Crypto.Hash import SHA256
 
-def verify_signature(data, sig_hex, pub_key):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import wire
+from keycache import KeyCache, fingerprint
+
+# Server public keys parsed so far, by fingerprint
+server_keys = KeyCache(RSA.import_key, maxsize=16)
+
+def verify_signature(data, signature, pub_key):
     h = SHA256.new(data.encode('utf-8'))
-    signature = bytes.fromhex(sig_hex)
+    if isinstance(signature, str):
+        signature = bytes.fromhex(signature)
     try:
         pkcs1_15.new(pub_key).verify(h, signature)
         return True
     except:
         return False
 
-def send_transactions(seller, transactions):
+def request(payload):
     host = '127.0.0.1'
     port = 65432
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.connect((host, port))
-    payload = {"seller": seller, "transactions": transactions}
     s.sendall(json.dumps(payload).encode())
     response = b""
     while True:
@@ -27,7 +36,26 @@ def send_transactions(seller, transactions):
             break
         response += part
     s.close()
-    return json.loads(response.decode())
+    if wire.is_binary(response):
+        return wire.loads(response)
+    response = json.loads(response.decode())
+    if "error" in response:
+        raise RuntimeError(f"server: {response['error']}")
+    return response
+
+def send_transactions(seller, transactions, key_fingerprint=None):
+    payload = {"seller": seller, "transactions": transactions, "formats": wire.FORMATS}
+    if key_fingerprint:
+        # We already hold the server's key, so it can skip sending the PEM
+        payload["key_fingerprint"] = key_fingerprint
+    return request(payload)
+
+def fetch_public_key(key_fingerprint):
+    """Ask the server for its PEM and cache it; it must match the fingerprint"""
+    pem = request({"op": "public_key"})["public_key"]
+    if fingerprint(pem).hex() != key_fingerprint:
+        raise RuntimeError("server key changed since the response was signed")
+    return server_keys.get(pem)
 
 def main():
     sellers_transactions = {
@@ -35,22 +63,39 @@ def main():
         "Seller2": [3, 4, 2]
     }
 
+    key_fingerprint = None
     for seller, transactions in sellers_transactions.items():
         print(f"Sending transactions for {seller}: {transactions}")
-        response = send_transactions(seller, transactions)
+        # Only offer the fingerprint while we still hold the key it names
+        if key_fingerprint and bytes.fromhex(key_fingerprint) not in server_keys:
+            key_fingerprint = None
+        response = send_transactions(seller, transactions, key_fingerprint)
         print("Received transaction summary:")
         for s, details in response["transaction_summary"].items():
             print(f" Seller: {s}")
             print(f" Transactions: {details['transactions']}")
             print(f" Total decrypted: {details['total_decrypted']}")
-            print(f" Digital Signature: {details.get('signature')}")
+            signature = details.get('signature')
+            print(f" Digital Signature: {signature.hex() if isinstance(signature, bytes) else signature}")
             print(f" Signature Verified: {details.get('signature_verified')}")
 
-            pub_key = RSA.import_key(response["public_key"])
-signed_summary = response["signed_summary"]
+        key_fingerprint = response.get("public_key_fingerprint")
+        if "public_key" not in response:
+            pub_key = server_keys.lookup(bytes.fromhex(key_fingerprint))
+            if pub_key is None:
+                # Evicted since we offered the fingerprint: fetch just the key
+                pub_key = fetch_public_key(key_fingerprint)
+                print(f" Fetched server public key after a cache miss (fingerprint {key_fingerprint[:16]}...)")
+            else:
+                print(f" Server public key taken from cache (fingerprint {key_fingerprint[:16]}...)")
+        else:
+            pub_key = server_keys.get(response["public_key"])
+            print(f" Received server public key ({len(response['public_key'])} bytes PEM)")
+        signed_summary = response["signed_summary"]
 
-valid = verify_signature(signed_summary, details.get('signature'), pub_key)
-print(f" Client-side Signature Verification (using exact signed summary): {valid}")
+        valid = verify_signature(signed_summary, response["signature"], pub_key)
+        print(f" Client-side Signature Verification (using exact signed summary): {valid}")
+    print(f"Key cache: {server_keys.stats()}")
 
 
 if __name__ == "__main__":
@@ -1,30 +1,80 @@
+import os
+import sys
 import socket
 import json
 from Crypto.Random import random
 from Crypto.Util import number
-from Crypto.PublicKey import RSA
 from Crypto.Signature import pkcs1_15
 from Crypto.Hash import SHA256
 
-# ElGamal class with homomorphic multiplication
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+from aggregate import Aggregator
+from fixedbase import DEFAULT_WINDOW, fixed_base
+from dlog import DiscreteLogTable
+from numtheory import elgamal_decrypt_many, modinv, powmod
+from keystore import KeyStore
+from keycache import fingerprint
+import wire
+
+# ElGamal class with homomorphic multiplication (addition in exponential mode)
 class ElGamal:
-    def __init__(self, bits=256):
-        self.p = number.getPrime(bits)
-        self.g = random.randint(2, self.p - 1)
-        self.x = random.randint(2, self.p - 2)
+    def __init__(self, bits=256, p=None, g=None, x=None, window=DEFAULT_WINDOW,
+                 exponential=False, max_value=2 ** 32, baby_steps=None, table_path=None):
+        if p is None:
+            p = number.getPrime(bits)
+            g = random.randint(2, p - 1)
+            x = random.randint(2, p - 2)
+        self.p = p
+        self.g = g
+        self.x = x
         self.h = pow(self.g, self.x, self.p)
+        self.window = window  # fixed-base table window in bits, 0 = plain pow
+        # Exponential mode encrypts g^m, so multiplying ciphertexts adds the
+        # plaintexts; decryption solves the discrete log for m < max_value
+        self.exponential = exponential
+        self.max_value = max_value
+        self.baby_steps = baby_steps
+        self.table_path = table_path
+        self._dlog = None
+
+    def dlog_table(self):
+        # Built (or loaded from table_path) on first use
+        if self._dlog is None:
+            self._dlog = DiscreteLogTable(self.p, self.g, self.max_value, self.baby_steps, self.table_path)
+        return self._dlog
+
+    def _pow_g_h(self, k):
+        # g and h are fixed for the key: precomputed tables, built on first use
+        if not self.window:
+            return pow(self.g, k, self.p), pow(self.h, k, self.p)
+        return (fixed_base(self.g, self.p, self.window).pow(k),
+                fixed_base(self.h, self.p, self.window).pow(k))
 
     def encrypt(self, m):
+        if self.exponential:
+            if not 0 <= m < self.max_value:
+                raise ValueError(f'plaintext must be in [0, {self.max_value})')
+            m = fixed_base(self.g, self.p, self.window).pow(m) if self.window else pow(self.g, m, self.p)
         k = random.randint(2, self.p - 2)
-        c1 = pow(self.g, k, self.p)
-        c2 = (m * pow(self.h, k, self.p)) % self.p
+        c1, s = self._pow_g_h(k)
+        c2 = (m * s) % self.p
         return (c1, c2)
 
     def decrypt(self, ciphertext):
         c1, c2 = ciphertext
-        s = pow(c1, self.x, self.p)
-        s_inv = pow(s, -1, self.p)
-        return (c2 * s_inv) % self.p
+        s = powmod(c1, self.x, self.p)
+        s_inv = modinv(s, self.p)
+        m = (c2 * s_inv) % self.p
+        return self.dlog_table().solve(m) if self.exponential else m
+
+    def decrypt_many(self, ciphertexts, workers=None, chunk_size=256, executor=None):
+        # c1^x in worker processes, one batch inversion (Montgomery's trick)
+        plain = elgamal_decrypt_many(ciphertexts, self.x, self.p, workers, chunk_size, executor)
+        if self.exponential:
+            table = self.dlog_table()
+            return [table.solve(m) for m in plain]
+        return plain
 
     def multiply(self, ct1, ct2):
         # Multiply ciphertexts homomorphically
@@ -32,11 +82,24 @@ class ElGamal:
         c2 = (ct1[1] * ct2[1]) % self.p
         return (c1, c2)
 
-# Generate ElGamal and RSA keypairs
-elgamal = ElGamal(bits=256)
-rsa_key = RSA.generate(2048)
+# Load ElGamal and RSA keypairs, generating them on the first start only
+keystore = KeyStore(os.path.join(HERE, 'server.keys'))
+p, g, x = keystore.get_or_create('elgamal', 'elgamal', 256)
+# Exponential ElGamal, so the aggregated total is a real sum; the discrete-log
+# table is built once and memory-mapped from server.dlog afterwards
+elgamal = ElGamal(p=p, g=g, x=x, exponential=True, baby_steps=2 ** 18,
+                  table_path=os.path.join(HERE, 'server.dlog'))
+elgamal.dlog_table()
+rsa_key = keystore.get_or_create('rsa', 'rsa', 2048)
+
+# Products of (c1, c2) pairs, reduced component-wise as balanced trees;
+# in exponential mode the product decrypts to the sum of the amounts
+aggregator = Aggregator(elgamal.p, components=2)
 private_rsa_key = rsa_key
 public_rsa_key = rsa_key.publickey()
+# Exported once; clients that already hold the key only get its fingerprint
+public_key_pem = public_rsa_key.export_key().decode()
+public_key_fingerprint = fingerprint(public_key_pem).hex()
 
 transaction_summary = {}
 
@@ -56,14 +119,12 @@ def verify_signature(data, sig_hex, pub_key):
 
 def process_transactions(seller_name, transactions):
     encrypted_transactions = [elgamal.encrypt(m) for m in transactions]
-    total_encrypted = encrypted_transactions[0]
-    for ct in encrypted_transactions[1:]:
-        total_encrypted = elgamal.multiply(total_encrypted, ct)
+    total_encrypted = aggregator.reduce(encrypted_transactions)
     decrypted_total = elgamal.decrypt(total_encrypted)
     transaction_summary[seller_name] = {
         "transactions": transactions,
-        "encrypted_transactions": [(str(ct[0]), str(ct[1])) for ct in encrypted_transactions],
-        "total_encrypted": (str(total_encrypted[0]), str(total_encrypted[1])),
+        "encrypted_transactions": encrypted_transactions,
+        "total_encrypted": total_encrypted,
         "total_decrypted": decrypted_total,
     }
 
@@ -75,6 +136,73 @@ def prepare_summary():
         summary += f"Total decrypted: {details['total_decrypted']}\n\n"
     return summary
 
+def encode_response(response, fmt):
+    # Ciphertexts are kept as int pairs; JSON carries them as decimal strings,
+    # the binary format as fixed-width records
+    packer = wire.Packer()
+
+    def pack_ct(ct):
+        return packer.elgamal(ct, elgamal.p) if fmt == 'binary' else (str(ct[0]), str(ct[1]))
+
+    def pack_sig(sig_hex):
+        return packer.signature(bytes.fromhex(sig_hex), public_rsa_key.n) if fmt == 'binary' else sig_hex
+
+    summary = {}
+    for seller, details in response["transaction_summary"].items():
+        details = dict(details)
+        details["encrypted_transactions"] = [pack_ct(ct) for ct in details["encrypted_transactions"]]
+        details["total_encrypted"] = pack_ct(details["total_encrypted"])
+        if "signature" in details:
+            details["signature"] = pack_sig(details["signature"])
+        summary[seller] = details
+    meta = dict(response, transaction_summary=summary, signature=pack_sig(response["signature"]), format=fmt)
+
+    if fmt == 'binary':
+        return packer.dumps(meta)
+    return json.dumps(meta).encode()
+
+def handle_request(payload):
+    """One seller's batch -> encoded response"""
+    if not isinstance(payload, dict):
+        raise ValueError('request must be a JSON object')
+    if payload.get("op") == "public_key":
+        # For clients whose cached copy of the key is gone
+        return json.dumps({"public_key": public_key_pem,
+                           "public_key_fingerprint": public_key_fingerprint}).encode()
+    seller = payload.get("seller")
+    transactions = payload.get("transactions")
+    if not isinstance(seller, str):
+        raise ValueError('seller must be a string')
+    if not isinstance(transactions, list) or not all(type(amt) is int for amt in transactions):
+        raise ValueError('transactions must be a list of integer amounts')
+    # Exponential ElGamal: every amount, and the total the discrete log has
+    # to recover, must be in [0, max_value)
+    if not all(0 <= amt < elgamal.max_value for amt in transactions):
+        raise ValueError(f'amounts must be in [0, {elgamal.max_value})')
+    if sum(transactions) >= elgamal.max_value:
+        raise ValueError(f'total must be below {elgamal.max_value}')
+
+    process_transactions(seller, transactions)
+
+    summary = prepare_summary()
+    signature = sign_data(summary, private_rsa_key)
+    transaction_summary[seller]["signature"] = signature
+    transaction_summary[seller]["signature_verified"] = verify_signature(summary, signature, public_rsa_key)
+
+    response = {
+        "transaction_summary": transaction_summary,
+        "signature": signature,
+        "signature_verified": transaction_summary[seller]["signature_verified"],
+        "signed_summary": summary,
+        "public_key_fingerprint": public_key_fingerprint,
+    }
+    if payload.get("key_fingerprint") != public_key_fingerprint:
+        response["public_key"] = public_key_pem
+
+    # Binary if the client offered it, JSON otherwise
+    fmt = wire.negotiate(payload.get("formats"))
+    return encode_response(response, fmt)
+
 def main():
     host = '127.0.0.1'
     port = 65432
@@ -87,31 +215,22 @@ def main():
     while True:
         conn, addr = s.accept()
         try:
-            data = conn.recv(8192).decode()
+            data = conn.recv(8192)
             if not data:
                 conn.close()
                 continue
 
-            payload = json.loads(data)
-            seller = payload["seller"]
-            transactions = payload["transactions"]
-
-            process_transactions(seller, transactions)
-
-            summary = prepare_summary()
-            signature = sign_data(summary, private_rsa_key)
-            transaction_summary[seller]["signature"] = signature
-            transaction_summary[seller]["signature_verified"] = verify_signature(summary, signature, public_rsa_key)
-
-            response = {
-                "transaction_summary": transaction_summary,
-                "signature": signature,
-                "signature_verified": transaction_summary[seller]["signature_verified"],
-                "public_key": public_rsa_key.export_key().decode()
-            }
-
-            conn.sendall(json.dumps(response).encode())
-        except Exception as e:
+            # A rejected request still gets an answer, so the client can
+            # report it instead of reading an empty response
+            try:
+                reply = handle_request(json.loads(data.decode()))
+            except ValueError as e:  # also malformed JSON / UTF-8
+                reply = json.dumps({"error": f"bad request: {e}"}).encode()
+            except Exception as e:
+                print("Error:", e)
+                reply = json.dumps({"error": f"server error: {e}"}).encode()
+            conn.sendall(reply)
+        except OSError as e:
             print("Error:", e)
         finally:
             conn.close()
@@ -0,0 +1,122 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Bounded LRU cache of parsed public keys.
+#
+# Verifiers see the same few signers over and over, and parsing a PEM key
+# (base64 + ASN.1 + building the key object) costs a noticeable share of an
+# RSA verify. Keys are cached under the SHA-256 fingerprint of their encoded
+# bytes, so a peer that has already sent its key once can send just the
+# 32-byte fingerprint afterwards and the verifier looks the key up directly.
+
+FINGERPRINT_SIZE = 32
+
+
+def fingerprint(data):
+    """SHA-256 of the encoded key (PEM/DER bytes, or str as UTF-8)"""
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).digest()
+
+
+class KeyCache:
+    """LRU of `load(data)` results keyed by fingerprint(data); thread-safe"""
+    def __init__(self, load, maxsize=128):
+        self.load = load
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, data):
+        """Parsed key for the encoded key `data`, parsing it on a miss"""
+        fp = fingerprint(data)
+        key = self.lookup(fp)
+        if key is None:
+            key = self.load(data)  # outside the lock, parsing is the slow part
+            self.add(fp, key)
+        return key
+
+    def lookup(self, fp):
+        """Cached key for a fingerprint, or None"""
+        with self._lock:
+            key = self._keys.get(fp)
+            if key is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._keys.move_to_end(fp)
+            return key
+
+    def add(self, fp, key):
+        with self._lock:
+            self._keys[fp] = key
+            self._keys.move_to_end(fp)
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, fp):
+        with self._lock:
+            return fp in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._keys), 'maxsize': self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+# ---------- Benchmark ----------
+
+def main():
+    from time import perf_counter
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+    signers = []
+    for _ in range(4):
+        sk = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = sk.public_key().public_bytes(serialization.Encoding.PEM,
+                                           serialization.PublicFormat.SubjectPublicKeyInfo)
+        message = b"Legal Document: signed copy"
+        signers.append((pem, message, sk.sign(message, padding.PKCS1v15(), hashes.SHA256())))
+    count = 2000
+    items = [signers[i % len(signers)] for i in range(count)]
+
+    def verify(key, message, signature):
+        key.verify(signature, message, padding.PKCS1v15(), hashes.SHA256())
+
+    start = perf_counter()
+    for pem, message, signature in items:
+        verify(serialization.load_pem_public_key(pem), message, signature)
+    parsed = count / (perf_counter() - start)
+
+    cache = KeyCache(serialization.load_pem_public_key)
+    start = perf_counter()
+    for pem, message, signature in items:
+        verify(cache.get(pem), message, signature)
+    cached = count / (perf_counter() - start)
+
+    fingerprints = [(fingerprint(pem), m, s) for pem, m, s in items]
+    start = perf_counter()
+    for fp, message, signature in fingerprints:
+        verify(cache.lookup(fp), message, signature)
+    by_fp = count / (perf_counter() - start)
+
+    print(f"RSA-2048 PKCS#1 v1.5 verify, {len(signers)} signers, {count} messages")
+    print(f"{'Key handling':<28} {'Verifies/s':<12} {'Speedup':<8}")
+    print(f"{'parse PEM every time':<28} {parsed:<12,.0f} {1.0:<8.2f}")
+    print(f"{'cache.get(PEM)':<28} {cached:<12,.0f} {cached / parsed:<8.2f}")
+    print(f"{'cache.lookup(fingerprint)':<28} {by_fp:<12,.0f} {by_fp / parsed:<8.2f}")
+    print(f"Cache: {cache.stats()}; PEM {len(signers[0][0])} bytes vs fingerprint {FINGERPRINT_SIZE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import os
+import struct
+import tempfile
+import threading
+
+# Binary keystore shared by the demo servers.
+#
+# File layout: MAGIC, then one record per key:
+#   kind (1 byte) | state (1 byte) | name length (1 byte) | name |
+#   number of ints (1 byte) | for each int: length (2 bytes) + big-endian bytes
+# Keys are stored as their defining integers, so loading is just parsing a
+# few big-endian numbers instead of re-running key generation.
+
+MAGIC = b'ISLK\x01'
+
+ACTIVE, SPARE, RETIRED = 0, 1, 2
+
+
+# ---------- Key kinds ----------
+
+def _paillier_to_ints(keypair):
+    public_key, private_key = keypair
+    return (private_key.p, private_key.q)
+
+def _paillier_from_ints(ints):
+    from phe import paillier
+    p, q = ints
+    public_key = paillier.PaillierPublicKey(p * q)
+    return public_key, paillier.PaillierPrivateKey(public_key, p, q)
+
+def _paillier_generate(bits):
+    from phe import paillier
+    return paillier.generate_paillier_keypair(n_length=bits)
+
+def _rsa_to_ints(key):
+    return (key.n, key.e, key.d, key.p, key.q)
+
+def _rsa_from_ints(ints):
+    from Crypto.PublicKey import RSA
+    return RSA.construct(ints, consistency_check=False)
+
+def _rsa_generate(bits):
+    from Crypto.PublicKey import RSA
+    return RSA.generate(bits)
+
+def _elgamal_generate(bits):
+    # Same construction as the ElGamal demo classes: (p, g, x)
+    from Crypto.Random import random
+    from Crypto.Util import number
+    p = number.getPrime(bits)
+    return (p, random.randint(2, p - 1), random.randint(2, p - 2))
+
+# kind -> (record code, to_ints, from_ints, generate)
+KINDS = {
+    'paillier': (1, _paillier_to_ints, _paillier_from_ints, _paillier_generate),
+    'rsa': (2, _rsa_to_ints, _rsa_from_ints, _rsa_generate),
+    'elgamal': (3, tuple, tuple, _elgamal_generate),
+}
+_KIND_BY_CODE = {code: kind for kind, (code, _, _, _) in KINDS.items()}
+
+
+# ---------- Encoding ----------
+
+def _encode_int(value):
+    raw = value.to_bytes((value.bit_length() + 7) // 8 or 1, 'big')
+    return struct.pack('>H', len(raw)) + raw
+
+def encode_records(records):
+    """records: list of (kind, state, name, ints)"""
+    out = [MAGIC]
+    for kind, state, name, ints in records:
+        name_bytes = name.encode()
+        out.append(struct.pack('>BBB', KINDS[kind][0], state, len(name_bytes)))
+        out.append(name_bytes)
+        out.append(struct.pack('>B', len(ints)))
+        out.extend(_encode_int(v) for v in ints)
+    return b''.join(out)
+
+def decode_records(data):
+    if not data.startswith(MAGIC):
+        raise ValueError('not a keystore file')
+    records = []
+    pos = len(MAGIC)
+    while pos < len(data):
+        code, state, name_len = struct.unpack_from('>BBB', data, pos)
+        pos += 3
+        name = data[pos:pos + name_len].decode()
+        pos += name_len
+        count = data[pos]
+        pos += 1
+        ints = []
+        for _ in range(count):
+            (length,) = struct.unpack_from('>H', data, pos)
+            pos += 2
+            ints.append(int.from_bytes(data[pos:pos + length], 'big'))
+            pos += length
+        records.append((_KIND_BY_CODE[code], state, name, tuple(ints)))
+    return records
+
+
+# ---------- Keystore ----------
+
+class KeyStore:
+    """Named keys persisted to one binary file.
+
+    Each name has one active key, optional spares generated ahead of time
+    for rotation, and the retired keys it replaced (kept so ciphertexts
+    issued under them can still be decrypted).
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = []
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                self._records = decode_records(f.read())
+
+    def _save(self):
+        # Private keys: write a fresh 0600 temp file next to the store (so
+        # concurrent writers never share a name) and swap it in atomically
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                   prefix=os.path.basename(self.path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(encode_records(self._records))
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _find(self, name, state):
+        return [r for r in self._records if r[2] == name and r[1] == state]
+
+    def has(self, name):
+        with self._lock:
+            return bool(self._find(name, ACTIVE))
+
+    def put(self, name, kind, key):
+        """Store key as the active key for name, retiring the previous one"""
+        ints = tuple(KINDS[kind][1](key))
+        with self._lock:
+            self._retire(name)
+            self._records.append((kind, ACTIVE, name, ints))
+            self._save()
+
+    def get(self, name):
+        """Active key for name, or None"""
+        with self._lock:
+            found = self._find(name, ACTIVE)
+        if not found:
+            return None
+        kind, _, _, ints = found[0]
+        return KINDS[kind][2](ints)
+
+    def get_or_create(self, name, kind, bits):
+        """Load the active key for name, generating and saving it on first use"""
+        key = self.get(name)
+        if key is None:
+            key = self._take_spare(name, kind)
+        if key is None:
+            key = KINDS[kind][3](bits)
+            self.put(name, kind, key)
+        return key
+
+    def retired(self, name):
+        with self._lock:
+            found = self._find(name, RETIRED)
+        return [KINDS[kind][2](ints) for kind, _, _, ints in found]
+
+    def _retire(self, name):
+        self._records = [(k, RETIRED if (n == name and s == ACTIVE) else s, n, i)
+                         for k, s, n, i in self._records]
+
+    def _take_spare(self, name, kind):
+        with self._lock:
+            spares = [r for r in self._find(name, SPARE) if r[0] == kind]
+            if not spares:
+                return None
+            spare = spares[0]
+            self._records.remove(spare)
+            self._retire(name)
+            self._records.append((kind, ACTIVE, name, spare[3]))
+            self._save()
+        return KINDS[kind][2](spare[3])
+
+    def rotate(self, name, kind, bits):
+        """Replace the active key with a spare (or a freshly generated key)"""
+        key = self._take_spare(name, kind)
+        if key is None:
+            key = KINDS[kind][3](bits)
+            self.put(name, kind, key)
+        return key
+
+    def pregenerate(self, name, kind, bits, count=1):
+        """Generate `count` spare keys for name on a background thread"""
+        def work():
+            for _ in range(count):
+                ints = tuple(KINDS[kind][1](KINDS[kind][3](bits)))
+                with self._lock:
+                    self._records.append((kind, SPARE, name, ints))
+                    self._save()
+
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+        return thread
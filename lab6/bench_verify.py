@@ -0,0 +1,46 @@
+import sys
+from time import perf_counter
+from elgamal_schnorr import ElGamalDS, SchnorrDS
+
+# Per-signature verification cost: verify() one at a time vs verify_batch(),
+# in the 1024-bit safe-prime MODP group (q = (p-1)/2).
+# Usage: python bench_verify.py [max_batch]  (default 4096)
+P = int("FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E08"
+        "8A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD"
+        "3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44"
+        "C42E9A637ED6B0BFF5CB6F406B7EDEE386BFB5A899FA5AE9F24117"
+        "C4B1FE649286651ECE65381FFFFFFFFFFFFFFFF", 16)
+Q = (P - 1) // 2
+G = 4
+BATCH_SIZES = [1, 16, 256, 4096]
+SINGLE_SAMPLE = 64  # one-by-one cost is measured on at most this many signatures
+
+def per_signature(func, count):
+    start = perf_counter()
+    result = func()
+    return (perf_counter() - start) / count, result
+
+def run(name, scheme, sign, sizes):
+    messages = [f"audit log entry {i}" for i in range(max(sizes))]
+    signatures = [sign(m) for m in messages]
+    sample = min(SINGLE_SAMPLE, len(messages))
+    single, ok = per_signature(lambda: [scheme.verify(m, s) for m, s in zip(messages[:sample], signatures[:sample])],
+                               sample)
+    assert all(ok), "verify failed!"
+    for n in sizes:
+        batch, ok = per_signature(lambda: scheme.verify_batch(messages[:n], signatures[:n]), n)
+        assert all(ok), "batch verify failed!"
+        print(f"{name:<10} {n:<8} {single * 1e6:<14.0f} {batch * 1e6:<14.0f} {single / batch:<8.2f}")
+
+def main():
+    max_batch = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    sizes = [n for n in BATCH_SIZES if n <= max_batch]
+    print(f"{P.bit_length()}-bit p, microseconds per signature")
+    print(f"{'Scheme':<10} {'Batch':<8} {'verify (us)':<14} {'batch (us)':<14} {'Speedup':<8}")
+    schnorr = SchnorrDS(P, Q, G)
+    run('Schnorr', schnorr, lambda m: schnorr.sign(m, with_R=True), sizes)
+    elgamal = ElGamalDS(P, G)
+    run('ElGamal', elgamal, elgamal.sign, sizes)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,33 @@
+import asyncio
+import os
 import socket
+import sys
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import hashes, serialization
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from keycache import FINGERPRINT_SIZE, KeyCache, fingerprint
+
 HOST = 'localhost'
 PORT = 65433
 
+# Protocol: the client sends (public key, message, signature) triples,
+# each field as a 4-byte big-endian length followed by the bytes, as many
+# triples per connection as it likes. The key field starts with a tag:
+# KEY_PEM followed by the PEM or, once the server has seen that PEM,
+# KEY_FINGERPRINT followed by its 32-byte SHA-256 fingerprint. The server
+# answers every triple, in order, with one byte: 1 = valid, 0 = invalid,
+# 2 = unknown fingerprint (resend the full PEM).
+VALID, INVALID, UNKNOWN_KEY = b'\x01', b'\x00', b'\x02'
+KEY_PEM, KEY_FINGERPRINT = b'P', b'F'
+_REPLIES = {True: VALID, False: INVALID, None: UNKNOWN_KEY}
+
+# Parsed public keys by fingerprint, shared by all connections
+public_keys = KeyCache(serialization.load_pem_public_key, maxsize=1024)
+
 def generate_rsa_keys():
     private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
     public_key = private_key.public_key()
@@ -21,7 +42,13 @@ def sign_message(private_key, message):
     return signature
 
 def verify_signature(public_key_pem, message, signature):
-    public_key = serialization.load_pem_public_key(public_key_pem)
+    try:
+        public_key = public_keys.get(public_key_pem)
+    except Exception:
+        return False  # malformed PEM, unsupported key type or curve, ...
+    return verify_with_key(public_key, message, signature)
+
+def verify_with_key(public_key, message, signature):
     try:
         public_key.verify(
             signature,
@@ -33,51 +60,113 @@ def verify_signature(public_key_pem, message, signature):
     except Exception:
         return False
 
-def server():
-    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_sock.bind((HOST, PORT))
-    server_sock.listen(1)
-    print("[Server] Listening for connections...")
-
-    conn, addr = server_sock.accept()
-    print(f"[Server] Connected by {addr}")
-
-    def recv_all(n):
-        data = b''
-        while len(data) < n:
-            packet = conn.recv(n - len(data))
-            if not packet:
-                return None
-            data += packet
-        return data
-
-    # Receive public key
-    pubkey_len = int.from_bytes(recv_all(4), 'big')
-    public_key_pem = recv_all(pubkey_len)
-
-    # Receive message
-    msg_len = int.from_bytes(recv_all(4), 'big')
-    message = recv_all(msg_len)
-
-    # Receive signature
-    sig_len = int.from_bytes(recv_all(4), 'big')
-    signature = recv_all(sig_len)
-
-    print("[Server] Received public key, message, and signature.")
-    print(f"[Server] Message:\n{message.decode()}")
-
-    valid = verify_signature(public_key_pem, message, signature)
-    if valid:
-        print("[Server] Signature is VALID. Message is authentic and signed by client.")
-    else:
-        print("[Server] Signature is INVALID! Message may be tampered.")
+def frame(data):
+    return len(data).to_bytes(4, 'big') + data
 
-    conn.close()
-    server_sock.close()
+def pem_field(public_key_pem):
+    return frame(KEY_PEM + public_key_pem)
 
-def client():
-    time.sleep(1)  # Wait for server to start
+def fingerprint_field(public_key_pem):
+    return frame(KEY_FINGERPRINT + fingerprint(public_key_pem))
+
+
+# ---------- Verification server (asyncio) ----------
+
+async def read_frame(reader):
+    """One length-prefixed field, or None on a clean EOF before it"""
+    try:
+        header = await reader.readexactly(4)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    return await reader.readexactly(int.from_bytes(header, 'big'))
+
+async def handle_client(reader, writer, executor, max_pending=64):
+    # The reader hands each triple to the thread pool right away and queues
+    # the future; the writer answers in order. A pipelining client keeps up
+    # to max_pending verifications of its own in flight.
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue(maxsize=max_pending)
+
+    async def reply():
+        try:
+            while True:
+                future = await pending.get()
+                if future is None:
+                    return
+                try:
+                    ok = await future
+                except Exception:
+                    ok = False  # a verifier failure rejects this triple, not the connection
+                writer.write(_REPLIES[ok])
+                await writer.drain()
+        except ConnectionError:
+            pass  # client went away; the reader notices through put()
+
+    replier = asyncio.create_task(reply())
+
+    async def put(item):
+        # Wait for room in the queue, unless the replier stops first: then
+        # nothing will ever drain it
+        putter = asyncio.ensure_future(pending.put(item))
+        await asyncio.wait([putter, replier], return_when=asyncio.FIRST_COMPLETED)
+        if not putter.done():
+            putter.cancel()
+            return False
+        return True
+
+    try:
+        while not replier.done():
+            key_field = await read_frame(reader)
+            if key_field is None:
+                break
+            message = await read_frame(reader)
+            signature = await read_frame(reader)
+            if message is None or signature is None:
+                break
+            tag, key = key_field[:1], key_field[1:]
+            if tag == KEY_PEM:
+                future = loop.run_in_executor(executor, verify_signature, key, message, signature)
+            elif tag == KEY_FINGERPRINT and len(key) == FINGERPRINT_SIZE:
+                public_key = public_keys.lookup(key)
+                if public_key is None:
+                    future = loop.create_future()
+                    future.set_result(None)  # UNKNOWN_KEY
+                else:
+                    future = loop.run_in_executor(executor, verify_with_key, public_key, message, signature)
+            else:
+                # Unknown tag or malformed fingerprint
+                future = loop.create_future()
+                future.set_result(False)
+            if not await put(future):
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        if not await put(None):
+            replier.cancel()
+        await asyncio.gather(replier, return_exceptions=True)
+        writer.close()
 
+async def serve(host=HOST, port=PORT, workers=None, ready=None):
+    workers = workers or os.cpu_count()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    srv = await asyncio.start_server(lambda r, w: handle_client(r, w, executor), host, port,
+                                     backlog=4096, reuse_address=True)
+    print(f"[Server] Verifying on {host}:{port} ({workers} verify threads)")
+    if ready is not None:
+        ready.set()
+    async with srv:
+        await srv.serve_forever()
+
+def server(ready=None, workers=None):
+    asyncio.run(serve(workers=workers, ready=ready))
+
+
+# ---------- Client ----------
+
+def client():
     # Generate keys and sign
     private_key, public_key = generate_rsa_keys()
     print("[Client] RSA key pair generated.")
@@ -96,23 +185,120 @@ def client():
     client_sock.connect((HOST, PORT))
     print("[Client] Connected to server.")
 
-    def send_with_len(data):
-        client_sock.send(len(data).to_bytes(4, 'big'))
-        client_sock.send(data)
+    # One genuine and one tampered message over the same connection. The key
+    # goes in full once; after the server has answered, its fingerprint does
+    client_sock.sendall(pem_field(public_key_pem) + frame(message) + frame(signature))
+    print(f"[Client] Sent public key ({len(public_key_pem)} bytes), message, and signature to server.")
+    replies = [client_sock.recv(1)]
+    client_sock.sendall(fingerprint_field(public_key_pem) + frame(message + b" (edited)") + frame(signature))
+    print(f"[Client] Sent key fingerprint ({FINGERPRINT_SIZE} bytes) with a tampered message.")
+    replies.append(client_sock.recv(1))
 
-    send_with_len(public_key_pem)
-    send_with_len(message)
-    send_with_len(signature)
-
-    print("[Client] Sent public key, message, and signature to server.")
+    for label, verdict in zip(("original", "tampered"), replies):
+        if verdict == UNKNOWN_KEY:
+            print(f"[Client] Server: {label} signature not checked, key fingerprint unknown.")
+        elif verdict == VALID:
+            print(f"[Client] Server: {label} signature is VALID. Message is authentic and signed by client.")
+        else:
+            print(f"[Client] Server: {label} signature is INVALID! Message may be tampered.")
     client_sock.close()
 
-if __name__ == "__main__":
-    server_thread = threading.Thread(target=server)
-    client_thread = threading.Thread(target=client)
 
-    server_thread.start()
-    client_thread.start()
+# ---------- Load generator ----------
+
+# Keys the server must reject without dropping the connection: not a PEM
+# at all, and a well-formed secp112r1 key, a curve OpenSSL doesn't support
+BAD_KEYS = {
+    'garbage PEM': b'-----BEGIN PUBLIC KEY-----\nbm90IGEga2V5\n-----END PUBLIC KEY-----\n',
+    'unsupported curve': b'-----BEGIN PUBLIC KEY-----\n'
+                         b'MDIwEAYHKoZIzj0CAQYFK4EEAAYDHgAEELi9Mya0f1m9BaprzuGVohsImKZfA5pdTeQhzQ==\n'
+                         b'-----END PUBLIC KEY-----\n',
+}
+
+async def check_bad_keys(good_request):
+    # Bad keys between two good messages on one connection: each bad one is
+    # answered INVALID and the connection keeps serving
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    writer.write(good_request)
+    for pem in BAD_KEYS.values():
+        writer.write(pem_field(pem) + frame(b"Audit record") + frame(bytes(256)))
+    writer.write(good_request)
+    replies = [await reader.readexactly(1) for _ in range(len(BAD_KEYS) + 2)]
+    writer.close()
+    assert replies == [VALID] + [INVALID] * len(BAD_KEYS) + [VALID], replies
+    print(f"[Load] Rejected bad keys ({', '.join(BAD_KEYS)}) without dropping the connection")
 
-    server_thread.join()
-    client_thread.join()
+async def load_client(requests, count, window, latencies):
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    sent = {}
+    valid = 0
+
+    async def receive():
+        nonlocal valid
+        for i in range(count):
+            verdict = await reader.readexactly(1)
+            latencies.append(time.perf_counter() - sent.pop(i))
+            valid += verdict == VALID
+            window.release()
+
+    receiver = asyncio.create_task(receive())
+    for i in range(count):
+        await window.acquire()
+        sent[i] = time.perf_counter()
+        writer.write(requests[i % len(requests)])
+        await writer.drain()
+    await receiver
+    writer.close()
+    return valid
+
+async def load_test(clients=200, per_client=50, pipeline=4, fingerprints=0):
+    # A few signers, messages signed up front so only verification is timed
+    requests = []
+    for _ in range(4):
+        private_key, public_key = generate_rsa_keys()
+        pem = public_key.public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+        key = fingerprint_field(pem) if fingerprints else pem_field(pem)
+        for i in range(8):
+            message = f"Audit record {i}: transfer approved".encode()
+            requests.append(key + frame(message) + frame(sign_message(private_key, message)))
+        with_pem = pem_field(pem) + requests[-1][len(key):]
+        if fingerprints:
+            # Register the full key once so fingerprint-only messages resolve
+            reader, writer = await asyncio.open_connection(HOST, PORT)
+            writer.write(with_pem)
+            assert await reader.readexactly(1) == VALID
+            writer.close()
+    await check_bad_keys(with_pem)
+
+    latencies = []
+    start = time.perf_counter()
+    valid = await asyncio.gather(*(load_client(requests, per_client, asyncio.Semaphore(pipeline), latencies)
+                                   for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    total = clients * per_client
+    assert sum(valid) == total, "server rejected a valid signature!"
+    latencies.sort()
+    print(f"[Load] {clients} connections x {per_client} messages, pipeline depth {pipeline}, "
+          f"key sent as {'fingerprint' if fingerprints else 'PEM'} ({len(requests[0])} bytes per message)")
+    print(f"[Load] {total / elapsed:,.0f} verifications/s, "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    # python client_server.py          demo: server thread + one client
+    # python client_server.py serve [verify threads]    long-running verification server
+    # python client_server.py load [clients] [messages per client] [pipeline depth] [fingerprints 0/1]
+    mode = sys.argv[1] if len(sys.argv) > 1 else 'demo'
+    if mode == 'serve':
+        server(workers=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif mode == 'load':
+        asyncio.run(load_test(*(int(a) for a in sys.argv[2:6])))
+    else:
+        ready = threading.Event()
+        server_thread = threading.Thread(target=server, args=(ready,), daemon=True)
+        server_thread.start()
+        ready.wait()
+        client()
+        print(f"[Server] Key cache: {public_keys.stats()}")
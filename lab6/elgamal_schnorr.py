@@ -1,23 +1,54 @@
+import os
 import random
+import sys
 from hashlib import sha256
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from numtheory import is_prime, legendre, modinv, multi_exp, powmod
+from fixedbase import fixed_base
+from refillpool import RefillPool
+
+# Batch verification multiplies each signature's equation by a random
+# BATCH_BITS-bit exponent; an invalid batch passes with probability ~2^-BATCH_BITS
+BATCH_BITS = 64
+_batch_random = random.SystemRandom()
+
 # ---------- Common helpers ----------
 
+def _to_bytes(m):
+    return m.encode() if isinstance(m, str) else m
+
 def hash_message(m):
-    return int(sha256(m.encode()).hexdigest(), 16)
+    # Digest bytes straight to an int (same value as parsing the hex digest)
+    return int.from_bytes(sha256(_to_bytes(m)).digest(), 'big')
+
+def hash_with_commitment(m, R, width):
+    """H(m || R) with R as `width` fixed big-endian bytes"""
+    return int.from_bytes(sha256(_to_bytes(m) + R.to_bytes(width, 'big')).digest(), 'big')
 
-def gcd(a, b):
-    while b:
-        a, b = b, a % b
-    return a
+def _batch_exponents(n):
+    return [_batch_random.getrandbits(BATCH_BITS) | 1 for _ in range(n)]
 
-def modinv(a, m):
-    m0, x0, x1 = m, 0, 1
-    while a > 1:
-        q = a // m
-        a, m = m, a % m
-        x0, x1 = x1 - q * x0, x0
-    return x1 + m0 if x1 < 0 else x1
+def _sign_of(symbol, exponent):
+    # symbol ** exponent for a Legendre symbol (+1 or -1)
+    return -1 if symbol == -1 and exponent % 2 else 1
+
+def bisect_verify(items, batch_ok, verify_one):
+    """Validity of every item: the whole list is tested as one batch, and a
+    failing batch is split in half until the bad items are isolated"""
+    valid = [True] * len(items)
+
+    def check(lo, hi):
+        if hi - lo == 1:
+            valid[lo] = verify_one(items[lo])
+        elif not batch_ok(items[lo:hi]):
+            mid = (lo + hi) // 2
+            check(lo, mid)
+            check(mid, hi)
+
+    if items:
+        check(0, len(items))
+    return valid
 
 
 # ---------- ElGamal Digital Signature ----------
@@ -30,16 +61,33 @@ class ElGamalDS:
         # Private key x in [1, p-2]
         self.x = random.randint(1, p - 2)
         # Public key y = g^x mod p
-        self.y = pow(g, self.x, p)
+        self.y = powmod(g, self.x, p)
+        # Batching is only sound in a safe-prime group, where Legendre symbols
+        # catch the order-2 errors that small batch exponents could cancel out.
+        # With other p, small subgroups of Z_p* would let forgeries through
+        self._safe = is_prime((p - 1) // 2)
+        self.nonce_pool = None
 
-    def sign(self, message):
-        H = hash_message(message) % self.p
+    def make_nonce(self):
+        """(k, g^k mod p, k^-1 mod p-1) for a random k coprime to p-1"""
         while True:
             k = random.randint(1, self.p - 2)
-            if gcd(k, self.p - 1) == 1:
-                break
-        r = pow(self.g, k, self.p)
-        k_inv = modinv(k, self.p - 1)
+            try:
+                k_inv = modinv(k, self.p - 1)  # fails exactly when gcd(k, p-1) != 1
+            except ValueError:
+                continue
+            return (k, fixed_base(self.g, self.p).pow(k), k_inv)
+
+    def attach_nonce_pool(self, size=256, low_watermark=64):
+        """Take nonces from a background-refilled RefillPool"""
+        if self.nonce_pool is not None:
+            self.nonce_pool.close()
+        self.nonce_pool = RefillPool(self.make_nonce, size, low_watermark)
+        return self.nonce_pool
+
+    def sign(self, message):
+        H = hash_message(message) % self.p
+        _, r, k_inv = self.nonce_pool.get() if self.nonce_pool is not None else self.make_nonce()
         s = (k_inv * (H - self.x * r)) % (self.p - 1)
         return (r, s)
 
@@ -48,10 +96,44 @@ class ElGamalDS:
         if not (0 < r < self.p):
             return False
         H = hash_message(message) % self.p
-        v1 = (pow(self.y, r, self.p) * pow(r, s, self.p)) % self.p
-        v2 = pow(self.g, H, self.p)
+        # y^r * r^s with one shared chain of squarings
+        v1 = multi_exp([(self.y, r), (r, s % (self.p - 1))], self.p)
+        v2 = powmod(self.g, H, self.p)
         return v1 == v2
 
+    def _batch_ok(self, items):
+        # prod_i (y^r_i * r_i^s_i * g^-H_i)^z_i == 1, as
+        # y^(sum z_i r_i) * prod_i r_i^(z_i s_i) == g^(sum z_i H_i)
+        order = self.p - 1
+        zs = _batch_exponents(len(items))
+        y_exp = sum(z * r for z, (_, r, _) in zip(zs, items)) % order
+        g_exp = sum(z * H for z, (H, _, _) in zip(zs, items)) % order
+        pairs = [(self.y, y_exp)] + [(r, z * s % order) for z, (_, r, s) in zip(zs, items)]
+        return multi_exp(pairs, self.p) == powmod(self.g, g_exp, self.p)
+
+    def _legendre_ok(self, H, r, s):
+        # The order-2 part of y^r * r^s * g^-H must vanish on its own
+        return _sign_of(legendre(self.y, self.p), r) * _sign_of(legendre(r, self.p), s) == \
+            _sign_of(legendre(self.g, self.p), H)
+
+    def verify_batch(self, messages, signatures):
+        """Verify many signatures under this key; returns one bool per signature"""
+        if not self._safe:
+            return [self.verify(message, signature) for message, signature in zip(messages, signatures)]
+        items, valid = [], []
+        for message, (r, s) in zip(messages, signatures):
+            H = hash_message(message) % self.p
+            ok = 0 < r < self.p and self._legendre_ok(H, r, s)
+            valid.append(ok)
+            if ok:
+                items.append((H, r, s))
+        checked = iter(bisect_verify(items, self._batch_ok, self._verify_item))
+        return [ok and next(checked) for ok in valid]
+
+    def _verify_item(self, item):
+        H, r, s = item
+        return multi_exp([(self.y, r), (r, s % (self.p - 1))], self.p) == powmod(self.g, H, self.p)
+
 
 # ---------- Schnorr Digital Signature ----------
 
@@ -64,21 +146,82 @@ class SchnorrDS:
         # Private key x in [1, q-1]
         self.x = random.randint(1, q - 1)
         # Public key y = g^x mod p
-        self.y = pow(g, self.x, p)
+        self.y = powmod(g, self.x, p)
+        self.R_width = (p.bit_length() + 7) // 8  # R is hashed as fixed-width bytes
+        self.nonce_pool = None
 
-    def sign(self, message):
+    def make_nonce(self):
+        """(k, g^k mod p) for a random k in [1, q-1]"""
         k = random.randint(1, self.q - 1)
-        R = pow(self.g, k, self.p)
-        e = hash_message(message + str(R)) % self.q
+        return (k, fixed_base(self.g, self.p).pow(k))
+
+    def attach_nonce_pool(self, size=256, low_watermark=64):
+        """Take nonces from a background-refilled RefillPool"""
+        if self.nonce_pool is not None:
+            self.nonce_pool.close()
+        self.nonce_pool = RefillPool(self.make_nonce, size, low_watermark)
+        return self.nonce_pool
+
+    def challenge(self, message, R):
+        return hash_with_commitment(message, R, self.R_width) % self.q
+
+    def sign(self, message, with_R=False):
+        # with_R=True returns (e, s, R): the commitment R is what makes
+        # signatures batch-verifiable, plain (e, s) ones need R recomputed
+        k, R = self.nonce_pool.get() if self.nonce_pool is not None else self.make_nonce()
+        e = self.challenge(message, R)
         s = (k + self.x * e) % self.q
-        return (e, s)
+        return (e, s, R) if with_R else (e, s)
+
+    def _commitment(self, e, s):
+        # R' = g^s * y^-e in one multi-exponentiation (Shamir's trick)
+        return multi_exp([(self.g, s % self.q), (self.y, (self.q - e) % self.q)], self.p)
 
     def verify(self, message, signature):
-        e, s = signature
-        R_prime = (pow(self.g, s, self.p) * pow(self.y, self.q - e, self.p)) % self.p
-        e_prime = hash_message(message + str(R_prime)) % self.q
+        e, s = signature[:2]
+        R_prime = self._commitment(e, s)
+        if len(signature) == 3 and R_prime != signature[2]:
+            return False
+        e_prime = self.challenge(message, R_prime)
         return e == e_prime
 
+    def _in_subgroup(self, R):
+        if not 0 < R < self.p:
+            return False
+        if self.p == 2 * self.q + 1:
+            return legendre(R, self.p) == 1  # the quadratic residues are the order-q subgroup
+        return powmod(R, self.q, self.p) == 1
+
+    def _batch_ok(self, items):
+        # g^(sum z_i s_i) * y^(-sum z_i e_i) == prod_i R_i^z_i
+        zs = _batch_exponents(len(items))
+        s_exp = sum(z * s for z, (_, s, _) in zip(zs, items)) % self.q
+        e_exp = -sum(z * e for z, (e, _, _) in zip(zs, items)) % self.q
+        lhs = multi_exp([(self.g, s_exp), (self.y, e_exp)], self.p)
+        return lhs == multi_exp([(R, z) for z, (_, _, R) in zip(zs, items)], self.p)
+
+    def verify_batch(self, messages, signatures):
+        """Verify many signatures under this key; returns one bool per signature.
+
+        (e, s, R) signatures are checked together in one combined equation
+        (bisecting on failure); plain (e, s) ones are verified one by one.
+        """
+        valid, batch, positions = [], [], []
+        for i, (message, signature) in enumerate(zip(messages, signatures)):
+            if len(signature) == 2:
+                valid.append(self.verify(message, signature))
+                continue
+            e, s, R = signature
+            ok = self._in_subgroup(R) and e == self.challenge(message, R)
+            valid.append(ok)
+            if ok:
+                batch.append(signature)
+                positions.append(i)
+        results = bisect_verify(batch, self._batch_ok, lambda sig: self._commitment(*sig[:2]) == sig[2])
+        for i, ok in zip(positions, results):
+            valid[i] = ok
+        return valid
+
 
 # ----------- Example usage -------------
 
@@ -98,7 +241,7 @@ def main():
     print("Schnorr Digital Signature:")
     p = 467
     q = 233
-    g = 2
+    g = 4  # must have order q; 2 has order 466 mod 467
     schnorr = SchnorrDS(p, q, g)
     message2 = "Hello, this is Bob."
     signature2 = schnorr.sign(message2)
@@ -106,6 +249,23 @@ def main():
     print(f"Signature: {signature2}")
     print(f"Verification: {schnorr.verify(message2, signature2)}")
 
+    # Batch verification, with one signature tampered with
+    messages = [f"Audit record {i}" for i in range(8)]
+    signatures = [schnorr.sign(m, with_R=True) for m in messages]
+    e, s, R = signatures[5]
+    signatures[5] = (e, (s + 1) % q, R)
+    print(f"\nSchnorr batch of {len(messages)} (record 5 tampered): {schnorr.verify_batch(messages, signatures)}")
+    signatures = [elgamal.sign(m) for m in messages]
+    print(f"ElGamal batch of {len(messages)}: {elgamal.verify_batch(messages, signatures)}")
+
+    # Precomputed nonces: signing is a hash and a few multiplications
+    pool = schnorr.attach_nonce_pool(size=32, low_watermark=8)
+    pool.fill()
+    signatures = [schnorr.sign(m) for m in messages]
+    print(f"Pooled Schnorr signatures verify: {all(schnorr.verify_batch(messages, signatures))}")
+    print(f"Nonce pool stats: {pool.stats()}")
+    pool.close()
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,32 @@
+from collections import deque
+from itertools import islice
+
+# Ordered, bounded fan-out of chunked work to a process pool, shared by the
+# batch APIs of the lab7 schemes. The per-key state lives in each module's
+# worker initializer; this only moves chunks and keeps results in order.
+
+def chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def fan_out(executor, func, items, chunk_size, max_pending):
+    """Yield func(chunk) results for every chunk of items, in input order.
+
+    At most max_pending chunks are in flight, so huge (or unbounded)
+    inputs are never fully buffered.
+    """
+    pending = deque()
+    try:
+        for chunk in chunks(items, chunk_size):
+            pending.append(executor.submit(func, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,33 @@
+import random
+from time import perf_counter
+from q1 import Paillier
+
+# Compare standard vs CRT Paillier decryption at several modulus sizes
+MODULUS_BITS = [1024, 2048, 3072]
+N_CIPHERTEXTS = 50
+
+def time_decrypt(paillier, ciphertexts):
+    start = perf_counter()
+    out = [paillier.decrypt(c) for c in ciphertexts]
+    return perf_counter() - start, out
+
+def main():
+    print(f"{'Modulus':<10} {'Standard (ms)':<15} {'CRT (ms)':<15} {'Speedup':<10}")
+    for bits in MODULUS_BITS:
+        paillier = Paillier(bit_length=bits // 2)
+        messages = [random.randrange(paillier.n) for _ in range(N_CIPHERTEXTS)]
+        ciphertexts = [paillier.encrypt(m) for m in messages]
+
+        paillier.use_crt = False
+        plain_time, plain_out = time_decrypt(paillier, ciphertexts)
+        paillier.use_crt = True
+        paillier.crt_params()  # one-off precomputation, not part of the timing
+        crt_time, crt_out = time_decrypt(paillier, ciphertexts)
+
+        assert plain_out == crt_out == messages, "CRT decryption mismatch!"
+        per_plain = plain_time * 1000 / N_CIPHERTEXTS
+        per_crt = crt_time * 1000 / N_CIPHERTEXTS
+        print(f"{bits:<10} {per_plain:<15.3f} {per_crt:<15.3f} {per_plain / per_crt:<10.2f}")
+
+if __name__ == "__main__":
+    main()
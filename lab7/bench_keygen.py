@@ -0,0 +1,50 @@
+import random
+import statistics
+from time import perf_counter
+from primes import generate_prime_pair
+from numtheory import is_prime
+
+# Timing distribution of p, q generation: naive loop vs sieved vs sieved + parallel
+PRIME_BITS = [256, 512, 1024]
+TRIALS = 20
+
+def naive_prime(length):
+    # The original lab7 generator: random odd candidate with the top bit
+    # set, then a full primality test on each one
+    while True:
+        p = random.getrandbits(length) | (1 << length - 1) | 1
+        if is_prime(p):
+            return p
+
+def naive_pair(length):
+    p = naive_prime(length)
+    q = naive_prime(length)
+    while q == p:
+        q = naive_prime(length)
+    return p, q
+
+def distribution(func, length):
+    samples = []
+    for _ in range(TRIALS):
+        start = perf_counter()
+        func(length)
+        samples.append((perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    return samples[0], statistics.median(samples), p95, samples[-1]
+
+def main():
+    methods = [
+        ('naive', naive_pair),
+        ('sieved', lambda length: generate_prime_pair(length, parallel=False)),
+        ('sieved+parallel', lambda length: generate_prime_pair(length, parallel=True)),
+    ]
+    print(f"p, q generation over {TRIALS} trials (ms)")
+    print(f"{'Bits':<6} {'Method':<17} {'min':<10} {'median':<10} {'p95':<10} {'max':<10}")
+    for bits in PRIME_BITS:
+        for name, func in methods:
+            lo, med, p95, hi = distribution(func, bits)
+            print(f"{bits:<6} {name:<17} {lo:<10.1f} {med:<10.1f} {p95:<10.1f} {hi:<10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import random
+import sys
+from time import perf_counter
+from q2 import RSA
+from aggregate import Aggregator
+from numtheory import BACKEND, mpz
+
+# Encrypted product of N RSA ciphertexts: serial fold vs product tree
+# (reducing every level, lazily every 2nd/3rd level, and across workers).
+# Usage: python bench_multiply.py [max_exponent]  (default 6, i.e. up to 10^6)
+MODULUS_BITS = 2048
+
+def ciphertext_stream(n, count, seed):
+    rng = random.Random(seed)  # same values for every method, never held in memory
+    return (rng.randrange(1, n) for _ in range(count))
+
+def timed(func, *args):
+    start = perf_counter()
+    result = func(*args)
+    return perf_counter() - start, result
+
+def serial_fold(values, n, num=int):
+    # num=mpz folds in the same integer type the trees use
+    n = num(n)
+    total = num(1)
+    for c in values:
+        total = (total * num(c)) % n
+    return int(total)
+
+def main():
+    max_exp = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    rsa = RSA(bit_length=MODULUS_BITS // 2)
+    methods = [
+        ('serial', lambda values: serial_fold(values, rsa.n)),
+        (f'serial {BACKEND}', lambda values: serial_fold(values, rsa.n, mpz)),
+        ('tree', lambda values: Aggregator(rsa.n, workers=1).reduce(values)),
+        ('tree lazy/2', lambda values: Aggregator(rsa.n, workers=1, reduce_every=2).reduce(values)),
+        ('tree lazy/3', lambda values: Aggregator(rsa.n, workers=1, reduce_every=3).reduce(values)),
+        ('tree parallel', lambda values: rsa.multiply_many(values)),
+    ]
+    print(f"{MODULUS_BITS}-bit RSA modulus, ciphertexts multiplied per second")
+    print(f"{'Count':<10}" + "".join(f"{name:<16}" for name, _ in methods))
+    for exp in range(3, max_exp + 1):
+        count = 10 ** exp
+        row, expected = [], None
+        for _, func in methods:
+            seconds, product = timed(func, ciphertext_stream(rsa.n, count, exp))
+            expected = product if expected is None else expected
+            assert product == expected, "product tree mismatch!"
+            row.append(count / seconds)
+        print(f"{count:<10}" + "".join(f"{rate:<16,.0f}" for rate in row))
+
+if __name__ == "__main__":
+    main()
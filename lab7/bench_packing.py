@@ -0,0 +1,41 @@
+import random
+from time import perf_counter
+from q1 import Paillier, PackingEncoder
+
+# One ciphertext per 32-bit amount vs k amounts packed per ciphertext
+MODULUS_BITS = 2048
+N_AMOUNTS = 200
+
+def ciphertext_bytes(paillier, count):
+    return count * ((paillier.n_sq.bit_length() + 7) // 8)
+
+def main():
+    paillier = Paillier(bit_length=MODULUS_BITS // 2, use_crt=True)
+    encoder = PackingEncoder(paillier, slot_bits=32, headroom_bits=16)
+    amounts = [random.getrandbits(32) for _ in range(N_AMOUNTS)]
+
+    start = perf_counter()
+    plain = [paillier.encrypt(a) for a in amounts]
+    plain_enc = perf_counter() - start
+    start = perf_counter()
+    plain_dec = [paillier.decrypt(c) for c in plain]
+    plain_dec_time = perf_counter() - start
+    assert plain_dec == amounts
+
+    start = perf_counter()
+    packed = encoder.encrypt_vector(amounts)
+    packed_enc = perf_counter() - start
+    start = perf_counter()
+    packed_dec = encoder.decrypt_vector(packed)
+    packed_dec_time = perf_counter() - start
+    assert packed_dec == amounts
+
+    print(f"{N_AMOUNTS} x 32-bit amounts, {MODULUS_BITS}-bit modulus, {encoder.slots} slots per ciphertext")
+    print(f"{'Mode':<10} {'Ciphertexts':<13} {'Bytes':<12} {'Encrypt (s)':<13} {'Decrypt (s)':<13}")
+    print(f"{'unpacked':<10} {len(plain):<13} {ciphertext_bytes(paillier, len(plain)):<12} "
+          f"{plain_enc:<13.3f} {plain_dec_time:<13.3f}")
+    print(f"{'packed':<10} {len(packed):<13} {ciphertext_bytes(paillier, len(packed)):<12} "
+          f"{packed_enc:<13.3f} {packed_dec_time:<13.3f}")
+
+if __name__ == "__main__":
+    main()
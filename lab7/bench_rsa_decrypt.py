@@ -0,0 +1,37 @@
+import random
+from time import perf_counter
+from q2 import RSA
+
+# Plain vs CRT vs batched (process pool + CRT) RSA decryption
+MODULUS_BITS = [1024, 2048, 3072]
+N_CIPHERTEXTS = 200
+
+def main():
+    print(f"{N_CIPHERTEXTS} ciphertexts per run, time per decryption (ms)")
+    print(f"{'Modulus':<10} {'Plain':<10} {'CRT':<10} {'Batched':<10} {'CRT speedup':<12}")
+    for bits in MODULUS_BITS:
+        rsa = RSA(bit_length=bits // 2)
+        messages = [random.randrange(rsa.n) for _ in range(N_CIPHERTEXTS)]
+        ciphertexts = [rsa.encrypt(m) for m in messages]
+
+        rsa.use_crt = False
+        start = perf_counter()
+        plain = [rsa.decrypt(c) for c in ciphertexts]
+        plain_ms = (perf_counter() - start) * 1000 / N_CIPHERTEXTS
+
+        rsa.use_crt = True
+        start = perf_counter()
+        crt = [rsa.decrypt(c) for c in ciphertexts]
+        crt_ms = (perf_counter() - start) * 1000 / N_CIPHERTEXTS
+
+        with rsa.make_executor() as executor:
+            rsa.decrypt_many(ciphertexts[:1], executor=executor)  # start the workers
+            start = perf_counter()
+            batched = rsa.decrypt_many(ciphertexts, chunk_size=32, executor=executor)
+            batched_ms = (perf_counter() - start) * 1000 / N_CIPHERTEXTS
+
+        assert plain == crt == batched == messages, "RSA decryption mismatch!"
+        print(f"{bits:<10} {plain_ms:<10.3f} {crt_ms:<10.3f} {batched_ms:<10.3f} {plain_ms / crt_ms:<12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from numtheory import is_prime
+
+# Candidate starting points come from the OS so forked workers never
+# search the same window
+_sysrand = random.SystemRandom()
+
+def _small_primes(limit):
+    """Sieve of Eratosthenes: all primes below limit"""
+    sieve = bytearray([1]) * limit
+    sieve[0] = sieve[1] = 0
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(limit) if sieve[i]]
+
+# Odd primes below 2^15 (3511 of them) used to sieve candidate windows,
+# paired with 2^-1 mod sp
+SMALL_PRIMES = _small_primes(1 << 15)[1:]
+_HALVES = [(sp, (sp + 1) // 2) for sp in SMALL_PRIMES]
+
+def _sieve_window(start, window):
+    """Flags for start, start+2, ..., start+2*(window-1); 0 means a small prime divides it"""
+    flags = bytearray([1]) * window
+    for sp, half in _HALVES:
+        # first k with start + 2k = 0 (mod sp)
+        k = ((sp - start % sp) * half) % sp
+        if sp < window:
+            flags[k::sp] = bytes(len(range(k, window, sp)))
+        elif k < window:
+            flags[k] = 0
+    return flags
+
+def generate_prime(length=512, window=None):
+    """Random prime of exactly `length` bits.
+
+    Picks a random odd start, sieves a window of following odd numbers
+    against SMALL_PRIMES in one pass, and only runs Miller-Rabin on the
+    survivors. A fresh start is drawn if the window holds no prime.
+    """
+    if length < 32:
+        raise ValueError('length must be at least 32 bits')
+    if window is None:
+        # Primes are ~0.35*length odd numbers apart on average, so this is ~6x the mean gap
+        window = max(256, 2 * length)
+    while True:
+        start = _sysrand.getrandbits(length) | (1 << length - 1) | 1
+        flags = _sieve_window(start, window)
+        for k in range(window):
+            if flags[k]:
+                candidate = start + 2 * k
+                if candidate.bit_length() != length:
+                    break
+                if is_prime(candidate):
+                    return candidate
+
+def generate_prime_pair(length=512, parallel=True):
+    """Two distinct `length`-bit primes, searched for in two worker processes"""
+    if not parallel:
+        p = generate_prime(length)
+        q = generate_prime(length)
+        while q == p:
+            q = generate_prime(length)
+        return p, q
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        p, q = executor.map(generate_prime, [length, length])
+    while q == p:
+        q = generate_prime(length)
+    return p, q
@@ -1,124 +1,280 @@
+import os
 import random
-from math import gcd
-
-def lcm(a, b):
-    return abs(a*b) // gcd(a, b)
-
-def modinv(a, m):
-    """Modular inverse using Extended Euclidean Algorithm"""
-    g, x, y = extended_gcd(a, m)
-    if g != 1:
-        raise Exception('modular inverse does not exist')
-    else:
-        return x % m
-
-def extended_gcd(a, b):
-    if a == 0:
-        return (b, 0, 1)
-    else:
-        g, y, x = extended_gcd(b % a, a)
-        return (g, x - (b // a) * y, y)
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from numtheory import gcd, lcm, modinv, powmod
+from batch import fan_out
+from primes import generate_prime, generate_prime_pair
+from refillpool import RefillPool
+
+# Encryption noise r must be unpredictable, so it comes from the OS CSPRNG
+# (as in phe), not the Mersenne Twister behind the random module functions
+_sysrand = random.SystemRandom()
 
 def L(u, n):
     return (u - 1) // n
 
-def generate_prime_candidate(length):
-    """Generate an odd integer randomly"""
-    p = random.getrandbits(length)
-    p |= (1 << length - 1) | 1  # Ensure high bit and low bit set
-    return p
-
-def is_prime(n, k=10):
-    """Miller-Rabin primality test"""
-    if n < 2:
-        return False
-    # Check small primes
-    small_primes = [2,3,5,7,11,13,17,19,23]
-    for sp in small_primes:
-        if n == sp:
-            return True
-        if n % sp == 0 and n != sp:
-            return False
-
-    # Find r, d such that n-1 = 2^r * d
-    r, d = 0, n-1
-    while d % 2 == 0:
-        d //= 2
-        r += 1
-
-    # Witness loop
-    for _ in range(k):
-        a = random.randrange(2, n-1)
-        x = pow(a, d, n)
-        if x == 1 or x == n-1:
-            continue
-        for _ in range(r-1):
-            x = pow(x, 2, n)
-            if x == n-1:
-                break
-        else:
-            return False
-    return True
-
 def generate_prime_number(length=512):
-    p = generate_prime_candidate(length)
-    while not is_prime(p):
-        p = generate_prime_candidate(length)
-    return p
+    """Sieve a window of candidates against small primes, then Miller-Rabin"""
+    return generate_prime(length)
+
+class NoisePool(RefillPool):
+    """Background-refilled pool of Paillier noise values r^n mod n^2, so
+    encryption only pays for a multiplication (see RefillPool)"""
+    def __init__(self, n, size=256, low_watermark=64):
+        self.n = n
+        self.n_sq = n * n
+        super().__init__(self._make_noise, size, low_watermark)
+
+    def _make_noise(self):
+        r = _sysrand.randint(1, self.n - 1)
+        while gcd(r, self.n) != 1:
+            r = _sysrand.randint(1, self.n - 1)
+        return powmod(r, self.n, self.n_sq)
+
+
+# Key held by each batch worker process, installed once by _init_worker
+_worker_key = None
+
+def _init_worker(p, q, use_crt):
+    global _worker_key
+    _worker_key = Paillier(p=p, q=q, use_crt=use_crt)
+
+def _encrypt_chunk(messages):
+    return [_worker_key.encrypt(m) for m in messages]
+
+def _decrypt_chunk(ciphertexts):
+    return [_worker_key.decrypt(c) for c in ciphertexts]
+
 
 class Paillier:
-    def __init__(self, bit_length=512):
-        self.p = generate_prime_number(bit_length)
-        self.q = generate_prime_number(bit_length)
-        while self.q == self.p:
-            self.q = generate_prime_number(bit_length)
+    def __init__(self, bit_length=512, use_crt=False, p=None, q=None, parallel_keygen=False):
+        if p is None or q is None:
+            p, q = generate_prime_pair(bit_length, parallel=parallel_keygen)
+        self.p = p
+        self.q = q
 
         self.n = self.p * self.q
         self.n_sq = self.n * self.n
         self.g = self.n + 1  # common choice for g
 
         self.lambda_param = lcm(self.p - 1, self.q - 1)
-        self.mu = modinv(L(pow(self.g, self.lambda_param, self.n_sq), self.n), self.n)
+        self.mu = modinv(L(powmod(self.g, self.lambda_param, self.n_sq), self.n), self.n)
+
+        # CRT decryption constants (hp, hq) are built on first use
+        self.use_crt = use_crt
+        self._crt = None
+        self.noise_pool = None
+
+    def attach_noise_pool(self, size=256, low_watermark=64):
+        """Serve encryption noise from a background-refilled NoisePool"""
+        if self.noise_pool is not None:
+            self.noise_pool.close()
+        self.noise_pool = NoisePool(self.n, size, low_watermark)
+        return self.noise_pool
 
     def encrypt(self, m):
         """Encrypt integer m"""
+        if not isinstance(m, int):
+            raise TypeError('Message must be an integer')
         if not (0 <= m < self.n):
             raise ValueError('Message must be in Z_n')
-        r = random.randint(1, self.n - 1)
-        while gcd(r, self.n) != 1:
-            r = random.randint(1, self.n - 1)
-        c = (pow(self.g, m, self.n_sq) * pow(r, self.n, self.n_sq)) % self.n_sq
+        if self.noise_pool is not None:
+            noise = self.noise_pool.get()
+        else:
+            r = _sysrand.randint(1, self.n - 1)
+            while gcd(r, self.n) != 1:
+                r = _sysrand.randint(1, self.n - 1)
+            noise = powmod(r, self.n, self.n_sq)
+        # g = n + 1, so g^m mod n^2 = 1 + m*n
+        c = ((1 + m * self.n) * noise) % self.n_sq
         return c
 
     def decrypt(self, c):
         """Decrypt ciphertext c"""
-        u = pow(c, self.lambda_param, self.n_sq)
+        if self.use_crt:
+            return self.decrypt_crt(c)
+        u = powmod(c, self.lambda_param, self.n_sq)
         l = L(u, self.n)
         m = (l * self.mu) % self.n
         return m
 
+    def crt_params(self):
+        """Precompute (p^2, q^2, hp, hq, q^-1 mod p) for CRT decryption"""
+        if self._crt is None:
+            p, q = self.p, self.q
+            p_sq, q_sq = p * p, q * q
+            hp = modinv(L(powmod(self.g, p - 1, p_sq), p), p)
+            hq = modinv(L(powmod(self.g, q - 1, q_sq), q), q)
+            q_inv = modinv(q, p)
+            self._crt = (p_sq, q_sq, hp, hq, q_inv)
+        return self._crt
+
+    def decrypt_crt(self, c):
+        """Decrypt ciphertext c working mod p^2 and q^2, then recombine"""
+        p, q = self.p, self.q
+        p_sq, q_sq, hp, hq, q_inv = self.crt_params()
+        mp = (L(powmod(c % p_sq, p - 1, p_sq), p) * hp) % p
+        mq = (L(powmod(c % q_sq, q - 1, q_sq), q) * hq) % q
+        # Garner recombination of (mp mod p, mq mod q)
+        return mq + q * (((mp - mq) * q_inv) % p)
+
+    def make_executor(self, workers=None):
+        """Process pool whose workers each receive this key once, at startup"""
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(self.p, self.q, self.use_crt))
+
+    def _fan_out(self, func, items, workers, chunk_size, executor):
+        own_executor = executor is None
+        if own_executor:
+            executor = self.make_executor(workers)
+        try:
+            yield from fan_out(executor, func, items, chunk_size, 2 * (workers or os.cpu_count() or 1))
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+    def iter_encrypt(self, messages, workers=None, chunk_size=256, executor=None):
+        """Encrypt a (possibly unbounded) iterable, yielding ciphertexts in input order"""
+        return self._fan_out(_encrypt_chunk, messages, workers, chunk_size, executor)
+
+    def iter_decrypt(self, ciphertexts, workers=None, chunk_size=256, executor=None):
+        """Decrypt a (possibly unbounded) iterable, yielding plaintexts in input order"""
+        return self._fan_out(_decrypt_chunk, ciphertexts, workers, chunk_size, executor)
+
+    def encrypt_many(self, messages, workers=None, chunk_size=256, executor=None):
+        """Encrypt many messages across worker processes"""
+        return list(self.iter_encrypt(messages, workers, chunk_size, executor))
+
+    def decrypt_many(self, ciphertexts, workers=None, chunk_size=256, executor=None):
+        """Decrypt many ciphertexts across worker processes"""
+        return list(self.iter_decrypt(ciphertexts, workers, chunk_size, executor))
+
     def add_ciphertexts(self, c1, c2):
         """Homomorphic addition of two ciphertexts"""
         return (c1 * c2) % self.n_sq
 
 
+class PackedCiphertext:
+    """Paillier ciphertext of several packed slots.
+
+    `additions` counts how many fresh ciphertexts have been summed into it,
+    which bounds how close each slot is to overflowing its headroom.
+    """
+    def __init__(self, c, length, additions=1):
+        self.c = c
+        self.length = length
+        self.additions = additions
+
+
+class PackingEncoder:
+    """Pack k fixed-width values into one Paillier plaintext.
+
+    Each slot is slot_bits wide plus headroom_bits of zero padding for
+    carries, so up to 2^headroom_bits packed ciphertexts can be added
+    before any slot can spill into its neighbour.
+    """
+    def __init__(self, paillier, slot_bits=32, headroom_bits=16):
+        self.paillier = paillier
+        self.slot_bits = slot_bits
+        self.width = slot_bits + headroom_bits
+        self.slots = (paillier.n.bit_length() - 1) // self.width
+        if self.slots < 1:
+            raise ValueError('modulus too small for one slot')
+        self.max_additions = 1 << headroom_bits
+        self._mask = (1 << self.width) - 1
+
+    def encode(self, values):
+        if len(values) > self.slots:
+            raise ValueError(f'at most {self.slots} values fit in one plaintext')
+        m = 0
+        for i, v in enumerate(values):
+            if not (0 <= v < 1 << self.slot_bits):
+                raise ValueError(f'value {v} does not fit in {self.slot_bits} bits')
+            m |= v << (i * self.width)
+        return m
+
+    def decode(self, m, length):
+        return [(m >> (i * self.width)) & self._mask for i in range(length)]
+
+    def encrypt(self, values):
+        """Encrypt up to `slots` values as one ciphertext"""
+        return PackedCiphertext(self.paillier.encrypt(self.encode(values)), len(values))
+
+    def decrypt(self, packed):
+        return self.decode(self.paillier.decrypt(packed.c), packed.length)
+
+    def add(self, a, b):
+        """Slot-wise homomorphic addition"""
+        additions = a.additions + b.additions
+        if additions > self.max_additions:
+            raise OverflowError(f'more than {self.max_additions} additions would overflow a slot')
+        c = self.paillier.add_ciphertexts(a.c, b.c)
+        return PackedCiphertext(c, max(a.length, b.length), additions)
+
+    def encrypt_vector(self, values):
+        """Encrypt a vector of any length as ceil(len / slots) ciphertexts"""
+        return [self.encrypt(values[i:i + self.slots]) for i in range(0, len(values), self.slots)]
+
+    def decrypt_vector(self, packed_list):
+        out = []
+        for packed in packed_list:
+            out.extend(self.decrypt(packed))
+        return out
+
+    def add_vectors(self, u, v):
+        """Element-wise sum of two vectors from encrypt_vector"""
+        if [a.length for a in u] != [b.length for b in v]:
+            raise ValueError('vectors must have the same length')
+        return [self.add(a, b) for a, b in zip(u, v)]
+
+
 # Demo
-paillier = Paillier(bit_length=128)  # smaller bits for faster demo
+if __name__ == "__main__":
+    paillier = Paillier(bit_length=128)  # smaller bits for faster demo
+
+    m1 = 15
+    m2 = 25
+
+    c1 = paillier.encrypt(m1)
+    c2 = paillier.encrypt(m2)
+
+    print(f"Ciphertext of {m1}: {c1}")
+    print(f"Ciphertext of {m2}: {c2}")
+
+    c_sum = paillier.add_ciphertexts(c1, c2)
+    print(f"Encrypted sum (ciphertext): {c_sum}")
 
-m1 = 15
-m2 = 25
+    m_sum = paillier.decrypt(c_sum)
+    print(f"Decrypted sum: {m_sum}")
 
-c1 = paillier.encrypt(m1)
-c2 = paillier.encrypt(m2)
+    assert m_sum == m1 + m2, "Decrypted sum does not match original sum!"
+    print("Verification passed: decrypted sum matches the sum of the original integers.")
 
-print(f"Ciphertext of {m1}: {c1}")
-print(f"Ciphertext of {m2}: {c2}")
+    # Same key, CRT decryption path
+    paillier.use_crt = True
+    assert paillier.decrypt(c_sum) == m_sum, "CRT decryption does not match standard decryption!"
+    print("CRT decryption matches standard decryption.")
 
-c_sum = paillier.add_ciphertexts(c1, c2)
-print(f"Encrypted sum (ciphertext): {c_sum}")
+    # Encrypt from a pool of precomputed noise values
+    pool = paillier.attach_noise_pool(size=32, low_watermark=8)
+    pool.fill()
+    pooled = [paillier.encrypt(m) for m in range(40)]
+    assert [paillier.decrypt(c) for c in pooled] == list(range(40))
+    print(f"Noise pool stats: {pool.stats()}")
+    pool.close()
 
-m_sum = paillier.decrypt(c_sum)
-print(f"Decrypted sum: {m_sum}")
+    # Batch API: chunks fan out to worker processes, results keep input order
+    batch = paillier.encrypt_many(range(100), workers=2, chunk_size=16)
+    assert paillier.decrypt_many(batch, workers=2, chunk_size=16) == list(range(100))
+    print("Batch encrypt/decrypt of 100 values round-trips in order.")
 
-assert m_sum == m1 + m2, "Decrypted sum does not match original sum!"
-print("Verification passed: decrypted sum matches the sum of the original integers.")
+    # Packing: several 32-bit amounts per ciphertext, added slot-wise
+    encoder = PackingEncoder(paillier, slot_bits=32, headroom_bits=16)
+    u = [100, 200, 300, 2**32 - 1]
+    v = [1, 2, 3, 4]
+    packed_sum = encoder.add_vectors(encoder.encrypt_vector(u), encoder.encrypt_vector(v))
+    assert encoder.decrypt_vector(packed_sum) == [a + b for a, b in zip(u, v)]
+    print(f"Packed {encoder.slots} slots per ciphertext; slot-wise sum: {encoder.decrypt_vector(packed_sum)}")
@@ -1,77 +1,40 @@
-import random
-from math import gcd
-
-def modinv(a, m):
-    """Modular inverse using Extended Euclidean Algorithm"""
-    g, x, y = extended_gcd(a, m)
-    if g != 1:
-        raise Exception('modular inverse does not exist')
-    else:
-        return x % m
-
-def extended_gcd(a, b):
-    if a == 0:
-        return (b, 0, 1)
-    else:
-        g, y, x = extended_gcd(b % a, a)
-        return (g, x - (b // a) * y, y)
-
-def is_prime(n, k=10):
-    """Miller-Rabin primality test"""
-    if n < 2:
-        return False
-    # Check small primes
-    small_primes = [2,3,5,7,11,13,17,19,23]
-    for sp in small_primes:
-        if n == sp:
-            return True
-        if n % sp == 0 and n != sp:
-            return False
-
-    # Find r, d such that n-1 = 2^r * d
-    r, d = 0, n-1
-    while d % 2 == 0:
-        d //= 2
-        r += 1
-
-    # Witness loop
-    for _ in range(k):
-        a = random.randrange(2, n-1)
-        x = pow(a, d, n)
-        if x == 1 or x == n-1:
-            continue
-        for _ in range(r-1):
-            x = pow(x, 2, n)
-            if x == n-1:
-                break
-        else:
-            return False
-    return True
-
-def generate_prime_candidate(length):
-    """Generate an odd integer randomly"""
-    p = random.getrandbits(length)
-    p |= (1 << length - 1) | 1  # Ensure high bit and low bit set
-    return p
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from numtheory import gcd, modinv, powmod
+from aggregate import Aggregator
+from batch import fan_out
+from primes import generate_prime, generate_prime_pair
 
 def generate_prime_number(length=512):
-    p = generate_prime_candidate(length)
-    while not is_prime(p):
-        p = generate_prime_candidate(length)
-    return p
+    """Sieve a window of candidates against small primes, then Miller-Rabin"""
+    return generate_prime(length)
+
+# Key held by each batch worker process, installed once by _init_worker
+_worker_key = None
+
+def _init_worker(p, q, e, use_crt):
+    global _worker_key
+    _worker_key = RSA(p=p, q=q, e=e, use_crt=use_crt)
+
+def _decrypt_chunk(ciphertexts):
+    return [_worker_key.decrypt(c) for c in ciphertexts]
+
 
 class RSA:
-    def __init__(self, bit_length=512):
-        self.p = generate_prime_number(bit_length)
-        self.q = generate_prime_number(bit_length)
-        while self.q == self.p:
-            self.q = generate_prime_number(bit_length)
+    def __init__(self, bit_length=512, parallel_keygen=False, p=None, q=None, e=None, use_crt=True):
+        if p is None or q is None:
+            p, q = generate_prime_pair(bit_length, parallel=parallel_keygen)
+        self.p = p
+        self.q = q
 
         self.n = self.p * self.q
         self.phi = (self.p - 1) * (self.q - 1)
 
         # Choose e coprime with phi
-        self.e = 65537  # common choice
+        self.e = e or 65537  # common choice
         if gcd(self.e, self.phi) != 1:
             # Find another e
             self.e = 3
@@ -80,33 +43,83 @@ class RSA:
 
         self.d = modinv(self.e, self.phi)
 
+        # CRT private-key parameters
+        self.use_crt = use_crt
+        self.dp = self.d % (self.p - 1)
+        self.dq = self.d % (self.q - 1)
+        self.qinv = modinv(self.q, self.p)
+
     def encrypt(self, m):
         if not (0 <= m < self.n):
             raise ValueError("Message out of range")
-        return pow(m, self.e, self.n)
+        return powmod(m, self.e, self.n)
 
     def decrypt(self, c):
-        return pow(c, self.d, self.n)
+        if self.use_crt:
+            return self.decrypt_crt(c)
+        return powmod(c, self.d, self.n)
+
+    def decrypt_crt(self, c):
+        """Two half-size exponentiations mod p and q, recombined with Garner"""
+        mp = powmod(c % self.p, self.dp, self.p)
+        mq = powmod(c % self.q, self.dq, self.q)
+        return mq + self.q * (((mp - mq) * self.qinv) % self.p)
+
+    def multiply_many(self, ciphertexts, workers=None, chunk_size=4096, reduce_every=1):
+        """Encrypted product of many ciphertexts, computed as a product tree.
+
+        Subtrees of chunk_size ciphertexts run in worker processes;
+        reduce_every > 1 reduces mod n only every few tree levels.
+        """
+        aggregator = Aggregator(self.n, workers=workers, chunk_size=chunk_size, reduce_every=reduce_every)
+        return aggregator.reduce(ciphertexts)
+
+    def make_executor(self, workers=None):
+        """Process pool whose workers each receive this key once, at startup"""
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(self.p, self.q, self.e, self.use_crt))
+
+    def iter_decrypt(self, ciphertexts, workers=None, chunk_size=256, executor=None):
+        """Decrypt a (possibly unbounded) iterable, yielding plaintexts in input order"""
+        own_executor = executor is None
+        if own_executor:
+            executor = self.make_executor(workers)
+        try:
+            yield from fan_out(executor, _decrypt_chunk, ciphertexts, chunk_size,
+                               2 * (workers or os.cpu_count() or 1))
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+    def decrypt_many(self, ciphertexts, workers=None, chunk_size=256, executor=None):
+        """Decrypt many ciphertexts across worker processes"""
+        return list(self.iter_decrypt(ciphertexts, workers, chunk_size, executor))
 
 # Demo
-rsa = RSA(bit_length=128)  # smaller bits for speed
+if __name__ == "__main__":
+    rsa = RSA(bit_length=128)  # smaller bits for speed
+
+    m1 = 7
+    m2 = 3
 
-m1 = 7
-m2 = 3
+    c1 = rsa.encrypt(m1)
+    c2 = rsa.encrypt(m2)
 
-c1 = rsa.encrypt(m1)
-c2 = rsa.encrypt(m2)
+    print(f"Ciphertext of {m1}: {c1}")
+    print(f"Ciphertext of {m2}: {c2}")
 
-print(f"Ciphertext of {m1}: {c1}")
-print(f"Ciphertext of {m2}: {c2}")
+    # Multiply ciphertexts (homomorphic multiplication)
+    c_mul = (c1 * c2) % rsa.n
+    print(f"Encrypted product (ciphertext): {c_mul}")
 
-# Multiply ciphertexts (homomorphic multiplication)
-c_mul = (c1 * c2) % rsa.n
-print(f"Encrypted product (ciphertext): {c_mul}")
+    # Product of many ciphertexts through a product tree
+    values = [2, 3, 5, 7, 11]
+    c_prod = rsa.multiply_many(rsa.encrypt(v) for v in values)
+    print(f"Decrypted product of {values}: {rsa.decrypt(c_prod)}")
 
-# Decrypt the product
-m_mul = rsa.decrypt(c_mul)
-print(f"Decrypted product: {m_mul}")
+    # Decrypt the product
+    m_mul = rsa.decrypt(c_mul)
+    print(f"Decrypted product: {m_mul}")
 
-assert m_mul == m1 * m2, "Decrypted product does not match original product!"
-print("Verification passed: decrypted product matches the product of the original integers.")
+    assert m_mul == m1 * m2, "Decrypted product does not match original product!"
+    print("Verification passed: decrypted product matches the product of the original integers.")
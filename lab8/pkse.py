@@ -1,7 +1,12 @@
 import os
-import pickle
+import sys
 from phe import paillier
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from keystore import KeyStore
+
+keystore = KeyStore("pkse.keys")
+
 # ---------- STEP 1: Dataset creation ----------
 def create_documents():
     if not os.path.exists("documents"):
@@ -29,13 +34,12 @@ def create_documents():
 
 # ---------- STEP 2: Load or generate Paillier keys ----------
 def save_keys(public_key, private_key):
-    with open("paillier_keys.pkl", "wb") as f:
-        pickle.dump((public_key, private_key), f)
+    keystore.put("pkse", "paillier", (public_key, private_key))
 
 def load_keys():
-    if os.path.exists("paillier_keys.pkl"):
-        with open("paillier_keys.pkl", "rb") as f:
-            return pickle.load(f)
+    keys = keystore.get("pkse")
+    if keys is not None:
+        return keys
     return None, None
 
 
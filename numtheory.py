@@ -0,0 +1,244 @@
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+# Number-theory primitives shared by the RSA, Paillier, ElGamal and Schnorr
+# labs. gmpy2's mpz routines are used when gmpy2 is installed; otherwise
+# everything falls back to Python built-ins. Results are always plain ints.
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+BACKEND = 'gmpy2' if gmpy2 is not None else 'python'
+
+SMALL_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47]
+
+
+# ---------- Pure Python ----------
+
+_py_gcd = math.gcd
+
+def extended_gcd(a, b):
+    """Returns (g, x, y) with a*x + b*y = g = gcd(a, b); iterative, so any size works"""
+    x0, y0, x1, y1 = 0, 1, 1, 0
+    while a != 0:
+        q = b // a
+        b, a = a, b % a
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+    return (b, x0, y0)
+
+def _py_modinv(a, m):
+    try:
+        return pow(a, -1, m)
+    except ValueError:
+        raise ValueError('modular inverse does not exist')
+
+def _py_powmod(a, e, m):
+    return pow(a, e, m)
+
+def _py_is_prime(n, k=10):
+    """Trial division by small primes, then k rounds of Miller-Rabin"""
+    if n < 2:
+        return False
+    for sp in SMALL_PRIMES:
+        if n == sp:
+            return True
+        if n % sp == 0:
+            return False
+
+    r, d = 0, n - 1
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+
+    for _ in range(k):
+        a = random.randrange(2, n - 1)
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+# ---------- gmpy2 ----------
+
+def _gmp_gcd(a, b):
+    return int(gmpy2.gcd(a, b))
+
+def _gmp_modinv(a, m):
+    try:
+        return int(gmpy2.invert(a, m))
+    except ZeroDivisionError:
+        raise ValueError('modular inverse does not exist')
+
+def _gmp_powmod(a, e, m):
+    return int(gmpy2.powmod(a, e, m))
+
+def _gmp_is_prime(n, k=10):
+    return bool(gmpy2.is_prime(n, k))
+
+
+# ---------- Public API ----------
+
+if gmpy2 is not None:
+    gcd, modinv, powmod, is_prime = _gmp_gcd, _gmp_modinv, _gmp_powmod, _gmp_is_prime
+else:
+    gcd, modinv, powmod, is_prime = _py_gcd, _py_modinv, _py_powmod, _py_is_prime
+
+def lcm(a, b):
+    return abs(a * b) // gcd(a, b)
+
+def mpz(a):
+    """Fast big-int type for long multiply/reduce chains (int without gmpy2)"""
+    return gmpy2.mpz(a) if gmpy2 is not None else a
+
+def multi_exp(pairs, m, window=None):
+    """prod(b^e for b, e in pairs) mod m with shared squarings (Straus/Shamir).
+
+    Every base gets a table of its first 2^window powers; the exponents are
+    then scanned together, window bits at a time, so one chain of squarings
+    serves all bases. Exponents must be non-negative; the default window
+    grows with the exponent size.
+    """
+    pairs = [(mpz(b) % m, e) for b, e in pairs if e]
+    if not pairs:
+        return 1 % m
+    m = mpz(m)
+    bits = max(e.bit_length() for _, e in pairs)
+    if window is None:
+        window = max(2, min(6, bits.bit_length() - 5))
+    mask = (1 << window) - 1
+    tables = []
+    for b, _ in pairs:
+        table = [mpz(1), b]
+        for _ in range(mask - 1):
+            table.append(table[-1] * b % m)
+        tables.append(table)
+
+    result = mpz(1)
+    for shift in range((bits - 1) // window * window, -1, -window):
+        if result != 1:
+            for _ in range(window):
+                result = result * result % m
+        for table, (_, e) in zip(tables, pairs):
+            digit = (e >> shift) & mask
+            if digit:
+                result = result * table[digit] % m
+    return int(result)
+
+def _py_legendre(a, p):
+    """Jacobi/Legendre symbol (a|p) for odd p, by quadratic reciprocity"""
+    a %= p
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if p % 8 in (3, 5):
+                result = -result
+        a, p = p, a
+        if a % 4 == 3 and p % 4 == 3:
+            result = -result
+        a %= p
+    return result if p == 1 else 0
+
+def legendre(a, p):
+    return int(gmpy2.jacobi(a, p)) if gmpy2 is not None else _py_legendre(a, p)
+
+def batch_modinv(values, m):
+    """Inverses of all values mod m with one inversion (Montgomery's trick).
+
+    Prefix products a1, a1*a2, ..., then one inverse of the full product,
+    unwound backwards: 3(n-1) multiplications in total.
+    """
+    values = [mpz(v) % m for v in values]
+    if not values:
+        return []
+    m = mpz(m)
+    prefix = [values[0]]
+    for v in values[1:]:
+        prefix.append(prefix[-1] * v % m)
+    inv = mpz(modinv(int(prefix[-1]), int(m)))
+    result = [0] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        result[i] = int(inv * prefix[i - 1] % m)
+        inv = inv * values[i] % m
+    result[0] = int(inv)
+    return result
+
+def _powmod_chunk(bases, e, m):
+    return [powmod(b, e, m) for b in bases]
+
+def powmod_many(bases, e, m, workers=None, chunk_size=256, executor=None):
+    """[b^e mod m for b in bases], chunks spread over worker processes.
+
+    Pass a long-lived `executor` to reuse its workers across calls. Without
+    one, a pool is only started when every worker gets at least a full
+    chunk; for less work, starting the processes costs more than it saves.
+    """
+    bases = list(bases)
+    if len(bases) <= chunk_size:
+        return _powmod_chunk(bases, e, m)
+    chunks = [bases[i:i + chunk_size] for i in range(0, len(bases), chunk_size)]
+    if executor is not None:
+        results = executor.map(_powmod_chunk, chunks, [e] * len(chunks), [m] * len(chunks))
+        return [r for chunk in results for r in chunk]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) < workers:
+        return _powmod_chunk(bases, e, m)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return powmod_many(bases, e, m, chunk_size=chunk_size, executor=executor)
+
+def elgamal_decrypt_many(ciphertexts, x, p, workers=None, chunk_size=256, executor=None):
+    """Plaintexts c2 / c1^x mod p of a batch of ElGamal (c1, c2) pairs.
+
+    The shared secrets c1^x go through powmod_many, then all of them are
+    inverted together with batch_modinv.
+    """
+    ciphertexts = list(ciphertexts)
+    secrets = powmod_many([c1 for c1, _ in ciphertexts], x, p, workers, chunk_size, executor)
+    inverses = batch_modinv(secrets, p)
+    return [(c2 * s_inv) % p for (_, c2), s_inv in zip(ciphertexts, inverses)]
+
+
+# ---------- Micro-benchmark ----------
+
+def main():
+    from timeit import timeit
+
+    bits = 2048
+    a = random.getrandbits(bits)
+    m = random.getrandbits(bits) | (1 << bits - 1) | 1
+    e = random.getrandbits(bits)
+    while _py_gcd(a, m) != 1:
+        a += 1
+    p = 2 ** 2203 - 1  # Mersenne prime, forces all Miller-Rabin rounds
+
+    cases = [
+        ('gcd', lambda f: f(a, m), _py_gcd, '_gmp_gcd', 2000),
+        ('modinv', lambda f: f(a, m), _py_modinv, '_gmp_modinv', 2000),
+        ('powmod', lambda f: f(a, e, m), _py_powmod, '_gmp_powmod', 50),
+        ('is_prime', lambda f: f(p), _py_is_prime, '_gmp_is_prime', 3),
+    ]
+    print(f"{bits}-bit operands, active backend: {BACKEND}")
+    print(f"{'Primitive':<10} {'python (us)':<13} {'gmpy2 (us)':<13} {'Speedup':<8}")
+    for name, call, py_func, gmp_name, number in cases:
+        py_us = timeit(lambda: call(py_func), number=number) / number * 1e6
+        if gmpy2 is None:
+            print(f"{name:<10} {py_us:<13.1f} {'-':<13} {'-':<8}")
+            continue
+        gmp_func = globals()[gmp_name]
+        assert call(gmp_func) == call(py_func)
+        gmp_us = timeit(lambda: call(gmp_func), number=number) / number * 1e6
+        print(f"{name:<10} {py_us:<13.1f} {gmp_us:<13.1f} {py_us / gmp_us:<8.1f}")
+
+if __name__ == "__main__":
+    main()
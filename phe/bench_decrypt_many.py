@@ -0,0 +1,40 @@
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from elagamal import ElGamal
+
+# Bulk ElGamal decryption: one decrypt() per ciphertext vs decrypt_many
+# (batch inversion only, workers=1) vs decrypt_many on a worker pool that is
+# started once and reused, so process startup isn't timed.
+# Usage: python bench_decrypt_many.py [count]  (default 2000)
+KEY_BITS = [1024, 2048]
+
+def timed(func, *args):
+    start = perf_counter()
+    result = func(*args)
+    return perf_counter() - start, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{count} ciphertexts, decryptions per second")
+    print(f"{'Bits':<6} {'decrypt':<12} {'batch inv':<12} {'batch+procs':<12} {'Speedup':<8}")
+    executor = ProcessPoolExecutor()
+    for bits in KEY_BITS:
+        elgamal = ElGamal(bits=bits)
+        plaintexts = [random.randrange(1, elgamal.p) for _ in range(count)]
+        ciphertexts = [elgamal.encrypt(m) for m in plaintexts]
+
+        loop, result = timed(lambda cts: [elgamal.decrypt(ct) for ct in cts], ciphertexts)
+        assert result == plaintexts, "decrypt mismatch!"
+        batch, result = timed(lambda cts: elgamal.decrypt_many(cts, workers=1), ciphertexts)
+        assert result == plaintexts, "batch decrypt mismatch!"
+        elgamal.decrypt_many(ciphertexts[:512], chunk_size=32, executor=executor)  # start the workers
+        parallel, result = timed(lambda cts: elgamal.decrypt_many(cts, executor=executor), ciphertexts)
+        assert result == plaintexts, "parallel decrypt mismatch!"
+        print(f"{bits:<6} {count / loop:<12,.0f} {count / batch:<12,.0f} {count / parallel:<12,.0f} "
+              f"{loop / min(batch, parallel):<8.2f}")
+    executor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,78 @@
+import os
+import sys
 from Crypto.Random import random
 from Crypto.Util import number
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aggregate import Aggregator
+from fixedbase import DEFAULT_WINDOW, fixed_base
+from numtheory import elgamal_decrypt_many, modinv, powmod
+
 class ElGamal:
-    def __init__(self, bits=256):
+    def __init__(self, bits=256, window=DEFAULT_WINDOW):
         self.p = number.getPrime(bits)
         self.g = random.randint(2, self.p - 1)
         self.x = random.randint(2, self.p - 2)  # Private key
         self.h = pow(self.g, self.x, self.p)   # Public key
+        self.window = window  # fixed-base table window in bits, 0 = plain pow
+
+    def _pow_g_h(self, k):
+        # g and h never change for this key: use precomputed tables
+        # (built on first use, see fixedbase.py)
+        if not self.window:
+            return pow(self.g, k, self.p), pow(self.h, k, self.p)
+        return (fixed_base(self.g, self.p, self.window).pow(k),
+                fixed_base(self.h, self.p, self.window).pow(k))
 
     def encrypt(self, m):
         k = random.randint(2, self.p - 2)
-        c1 = pow(self.g, k, self.p)
-        c2 = (m * pow(self.h, k, self.p)) % self.p
+        c1, s = self._pow_g_h(k)
+        c2 = (m * s) % self.p
         return (c1, c2)
 
     def decrypt(self, ciphertext):
         c1, c2 = ciphertext
-        s = pow(c1, self.x, self.p)
-        s_inv = pow(s, -1, self.p)
+        s = powmod(c1, self.x, self.p)
+        s_inv = modinv(s, self.p)
         return (c2 * s_inv) % self.p
 
+    def decrypt_many(self, ciphertexts, workers=None, chunk_size=256, executor=None):
+        # Shared secrets c1^x in worker processes (or a pool passed in), then
+        # all of them inverted at once (Montgomery's trick: one inversion +
+        # 3(n-1) multiplications)
+        return elgamal_decrypt_many(ciphertexts, self.x, self.p, workers, chunk_size, executor)
+
     def multiply(self, ct1, ct2):
         # Homomorphic multiplication on ciphertexts
         c1 = (ct1[0] * ct2[0]) % self.p
         c2 = (ct1[1] * ct2[1]) % self.p
         return (c1, c2)
 
+    def multiply_many(self, ciphertexts, workers=None, chunk_size=4096, reduce_every=1):
+        # Homomorphic product of many ciphertexts: c1 and c2 components are
+        # reduced in two independent product trees, subtrees in worker processes
+        aggregator = Aggregator(self.p, components=2, workers=workers,
+                                chunk_size=chunk_size, reduce_every=reduce_every)
+        return aggregator.reduce(ciphertexts)
+
 # Demo:
-elgamal = ElGamal()
-m1, m2 = 7, 3
+if __name__ == "__main__":
+    elgamal = ElGamal()
+    m1, m2 = 7, 3
+
+    enc1 = elgamal.encrypt(m1)
+    enc2 = elgamal.encrypt(m2)
 
-enc1 = elgamal.encrypt(m1)
-enc2 = elgamal.encrypt(m2)
+    print("Encrypted m1:", enc1)
+    print("Encrypted m2:", enc2)
 
-print("Encrypted m1:", enc1)
-print("Encrypted m2:", enc2)
+    enc_mul = elgamal.multiply(enc1, enc2)
+    print("Encrypted multiplication:", enc_mul)
 
-enc_mul = elgamal.multiply(enc1, enc2)
-print("Encrypted multiplication:", enc_mul)
+    dec_mul = elgamal.decrypt(enc_mul)
+    print("Decrypted multiplication result:", dec_mul)  # Should be 21 (7*3)
 
-dec_mul = elgamal.decrypt(enc_mul)
-print("Decrypted multiplication result:", dec_mul)  # Should be 21 (7*3)
+    values = [2, 3, 5, 7]
+    enc_prod = elgamal.multiply_many(elgamal.encrypt(v) for v in values)
+    print(f"Decrypted product of {values}:", elgamal.decrypt(enc_prod))  # Should be 210
+    print("Batch decrypted:", elgamal.decrypt_many([enc1, enc2, enc_mul]))  # Should be [7, 3, 21]
@@ -1,5 +1,10 @@
+import os
+import sys
 from phe import paillier
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aggregate import Aggregator
+
 # Key generation (usually server)
 public_key, private_key = paillier.generate_paillier_keypair(n_length=512)
 
@@ -8,10 +13,11 @@ party_inputs = [10, 15, 21]
 
 encrypted_inputs = [public_key.encrypt(x) for x in party_inputs]
 
-# Server performs homomorphic addition without seeing plaintexts
-enc_total = encrypted_inputs[0]
-for ct in encrypted_inputs[1:]:
-    enc_total += ct
+# Server performs homomorphic addition without seeing plaintexts:
+# a tree-reduced product of the ciphertexts mod n^2
+aggregator = Aggregator(public_key.nsquare)
+enc_total = paillier.EncryptedNumber(
+    public_key, aggregator.reduce(ct.ciphertext(be_secure=False) for ct in encrypted_inputs))
 
 # Server decrypts the total only
 decrypted_total = private_key.decrypt(enc_total)
@@ -19,3 +25,4 @@ decrypted_total = private_key.decrypt(enc_total)
 print("Encrypted inputs:", [ct.ciphertext() for ct in encrypted_inputs])
 print("Encrypted total:", enc_total.ciphertext())
 print("Decrypted total:", decrypted_total)  # Should be sum of inputs: 46
+print(f"Aggregation throughput: {aggregator.stats['per_second']:.0f} ciphertexts/s")
@@ -0,0 +1,82 @@
+import threading
+from collections import deque
+
+# Pools of precomputed values, refilled in the background.
+#
+# Paillier noise (r^n mod n^2) and signing nonces (k, g^k, ...) don't depend
+# on the message, so they can be made ahead of time while the process would
+# otherwise be idle. The expensive part of an encryption or signature is then
+# a pop from a deque.
+
+
+class RefillPool:
+    """Background-refilled pool of values produced by `make()`.
+
+    A daemon thread tops the pool back up to `size` whenever it drops to
+    `low_watermark`. When the pool is empty, get() calls make() inline and
+    counts it as a miss. Every value is handed out exactly once.
+    """
+    def __init__(self, make, size=256, low_watermark=64):
+        if not (0 <= low_watermark < size):
+            raise ValueError('low_watermark must be in [0, size)')
+        self.make = make
+        self.size = size
+        self.low_watermark = low_watermark
+
+        self._pool = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+
+        self._thread = threading.Thread(target=self._refill_loop, daemon=True)
+        self._thread.start()
+        self._wake.set()
+
+    def _refill_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopped:
+                return
+            while len(self._pool) < self.size and not self._stopped:
+                self._pool.append(self.make())
+            with self._lock:
+                self.refills += 1
+
+    def fill(self):
+        """Synchronously fill the pool up to `size` (e.g. before a burst)"""
+        while len(self._pool) < self.size:
+            self._pool.append(self.make())
+
+    def get(self):
+        """Take one precomputed value, calling make() inline if dry"""
+        try:
+            value = self._pool.popleft()
+            with self._lock:
+                self.hits += 1
+        except IndexError:
+            value = self.make()
+            with self._lock:
+                self.misses += 1
+        if len(self._pool) <= self.low_watermark:
+            self._wake.set()
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'low_watermark': self.low_watermark,
+                'available': len(self._pool),
+                'hits': self.hits,
+                'misses': self.misses,
+                'refills': self.refills,
+            }
+
+    def close(self):
+        self._stopped = True
+        self._wake.set()
+        self._thread.join()
@@ -1,33 +1,211 @@
+import os
+import sys
 import socket
 import json
+import threading
+from collections import deque
+from contextlib import contextmanager
 
-def send_transactions(seller_name, transactions):
-    import socket
-    import json
-    
-    host = '127.0.0.1'
-    port = 65432
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import wire
 
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.connect((host, port))
+HOST = '127.0.0.1'
+PORT = 65432
 
-    data = {
+
+def decode_response(body):
+    if wire.is_binary(body):
+        return wire.loads(body)
+    response = json.loads(body.decode('utf-8'))
+    if 'error' in response:
+        raise RuntimeError(f"server: {response['error']}")
+    return response
+
+
+class Connection:
+    """A framed connection to the server; requests can be pipelined"""
+    def __init__(self, host=HOST, port=PORT):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._next_id = 0
+
+    def submit(self, payload):
+        """Send a request without waiting for its response; returns its id"""
+        request_id = self._next_id
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        wire.send_frame(self.sock, request_id, json.dumps(payload).encode('utf-8'))
+        return request_id
+
+    def receive(self):
+        frame = wire.recv_frame(self.sock)
+        if frame is None:
+            raise ConnectionError('server closed the connection')
+        request_id, body = frame
+        return request_id, decode_response(body)
+
+    def _expect(self, request_id):
+        got, response = self.receive()
+        if got != request_id:
+            raise ConnectionError(f'response for request {got}, expected {request_id}')
+        return response
+
+    def pipeline(self, payloads, depth=8):
+        """Responses to `payloads`, in order, keeping up to `depth` requests in flight"""
+        pending = deque()
+        responses = []
+        for payload in payloads:
+            if len(pending) >= depth:
+                responses.append(self._expect(pending.popleft()))
+            pending.append(self.submit(payload))
+        while pending:
+            responses.append(self._expect(pending.popleft()))
+        return responses
+
+    def request(self, payload):
+        return self.pipeline([payload])[0]
+
+    def close(self):
+        self.sock.close()
+
+
+class ConnectionPool:
+    """Keeps connections open between requests, at most `size` at a time"""
+    def __init__(self, host=HOST, port=PORT, size=4):
+        self.host = host
+        self.port = port
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        try:
+            if conn is None:
+                conn = Connection(self.host, self.port)
+            yield conn
+        except BaseException:
+            # Responses may still be in flight, so the connection can't be reused
+            if conn is not None:
+                conn.close()
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                with self._lock:
+                    self._idle.append(conn)
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
+
+
+pool = ConnectionPool()
+
+
+def make_payload(seller_name, transactions):
+    return {
         'seller': seller_name,
-        'transactions': transactions
+        'transactions': transactions,
+        'formats': wire.FORMATS  # server answers in binary if it supports it
     }
-    s.sendall(json.dumps(data).encode('utf-8'))
 
-    # Receive all data in chunks
-    chunks = []
-    while True:
-        chunk = s.recv(4096)
-        if not chunk:
-            break
-        chunks.append(chunk)
-    s.close()
-    
-    complete_data = b''.join(chunks).decode('utf-8')
-    return json.loads(complete_data)
+def send_transactions(seller_name, transactions, pool=pool):
+    with pool.connection() as conn:
+        return conn.request(make_payload(seller_name, transactions))
+
+def send_batches(batches, pool=pool, depth=8):
+    """Pipeline many (seller, transactions) batches over one pooled connection"""
+    with pool.connection() as conn:
+        return conn.pipeline([make_payload(seller, transactions) for seller, transactions in batches], depth)
+
+
+def print_summary(result):
+    print("Transaction Summary Received:")
+    for sel, vals in result['transaction_summary'].items():
+        print(f"Seller: {sel}")
+        print(f" Individual Amounts: {vals['individual_transaction_amounts']}")
+        print(f" Encrypted Amounts: {vals['encrypted_transaction_amounts']}")
+        print(f" Total Encrypted: {vals['total_encrypted_transaction_amount']}")
+        print(f" Total Decrypted: {vals['total_decrypted_transaction_amount']}")
+        signature = vals.get('digital_signature')
+        if isinstance(signature, bytes):
+            signature = signature.hex()
+        print(f" Digital Signature: {signature}")
+        print(f" Signature Verified: {vals.get('signature_verification')}")
+        print("")
+
+
+# ---------- Benchmark ----------
+
+def benchmark(batches=24, pings=2000, depth=8, connections=4):
+    from time import perf_counter
+
+    # A seller batch costs the server ~85 ms of Paillier and RSA work, which
+    # hides the transport; pings (no crypto) show the transport alone. A few
+    # sellers are reused so the summary (and response) stays small.
+    seller_batches = [make_payload(f"BenchSeller{i % 4}", [10 + i % 7, 20, 30]) for i in range(batches)]
+    ping_batches = [{'op': 'ping'}] * pings
+    bench_pool = ConnectionPool(size=connections)
+
+    def per_request(payloads):
+        responses = []
+        for payload in payloads:
+            conn = Connection()
+            responses.append(conn.request(payload))
+            conn.close()
+        return responses
+
+    def pooled(payloads):
+        responses = []
+        for payload in payloads:
+            with bench_pool.connection() as conn:
+                responses.append(conn.request(payload))
+        return responses
+
+    def pipelined(payloads):
+        with bench_pool.connection() as conn:
+            return conn.pipeline(payloads, depth)
+
+    def pipelined_parallel(payloads):
+        chunks = [payloads[i::connections] for i in range(connections)]
+        results = [None] * connections
+
+        def worker(i):
+            results[i] = pipelined(chunks[i])
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(connections)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return [r for chunk in results for r in chunk]
+
+    transports = [
+        ("new connection/request", per_request),
+        ("pooled, sequential", pooled),
+        ("pooled, pipelined (1)", pipelined),
+        (f"pooled, pipelined ({connections})", pipelined_parallel),
+    ]
+    # Start the server well before benchmarking: while its noise pool is
+    # refilling it competes with request handling for the CPU
+    pipelined(ping_batches[:100] + seller_batches[:1])  # warm up the server and the pool
+    rates = {}
+    for kind, payloads in (('ping', ping_batches), ('batch', seller_batches)):
+        for label, func in transports:
+            start = perf_counter()
+            responses = func(payloads)
+            rates[label, kind] = len(payloads) / (perf_counter() - start)
+            assert len(responses) == len(payloads)
+    print(f"Requests/s, pipeline depth {depth}")
+    print(f"{'Transport':<36} {'ping x%d' % pings:>12} {'batch x%d' % batches:>12}")
+    for label, func in transports:
+        print(f"{label:<36} {rates[label, 'ping']:>12,.0f} {rates[label, 'batch']:>12,.1f}")
+    bench_pool.close()
 
 
 def main():
@@ -39,17 +217,13 @@ def main():
 
     for seller, transactions in sellers_data.items():
         print(f"Sending data for {seller}: {transactions}")
-        result = send_transactions(seller, transactions)
-        print("Transaction Summary Received:")
-        for sel, vals in result['transaction_summary'].items():
-            print(f"Seller: {sel}")
-            print(f" Individual Amounts: {vals['individual_transaction_amounts']}")
-            print(f" Encrypted Amounts: {vals['encrypted_transaction_amounts']}")
-            print(f" Total Encrypted: {vals['total_encrypted_transaction_amount']}")
-            print(f" Total Decrypted: {vals['total_decrypted_transaction_amount']}")
-            print(f" Digital Signature: {vals.get('digital_signature')}")
-            print(f" Signature Verified: {vals.get('signature_verification')}")
-            print("")
+    # Both batches go out back to back on one connection
+    for result in send_batches(sellers_data.items()):
+        print_summary(result)
+    pool.close()
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ['bench']:
+        benchmark()
+    else:
+        main()
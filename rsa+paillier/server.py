@@ -1,20 +1,41 @@
+import os
+import sys
 import socket
 import json
+import threading
 from phe import paillier
-from Crypto.PublicKey import RSA
 from Crypto.Signature import pkcs1_15
 from Crypto.Hash import SHA256
 
-# Generate Paillier keypair
-public_key, private_key = paillier.generate_paillier_keypair()
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, os.path.join(HERE, '..', 'lab7'))
+from aggregate import Aggregator
+from keystore import KeyStore
+import wire
+from q1 import NoisePool
 
-# Generate RSA keypair for digital signatures
-rsa_key = RSA.generate(2048)
+# Keys are generated on the first start only and reloaded from disk afterwards,
+# so ciphertexts issued before a restart stay decryptable
+keystore = KeyStore(os.path.join(HERE, 'server.keys'))
+
+# Load (or generate) Paillier keypair
+public_key, private_key = keystore.get_or_create('paillier', 'paillier', paillier.DEFAULT_KEYSIZE)
+
+# Precomputed r^n mod n^2 values so encryption during a burst is one multiplication
+noise_pool = NoisePool(public_key.n, size=512, low_watermark=128)
+
+# Homomorphic sums are products mod n^2, reduced as a balanced tree across processes
+aggregator = Aggregator(public_key.nsquare)
+
+# Load (or generate) RSA keypair for digital signatures
+rsa_key = keystore.get_or_create('rsa', 'rsa', 2048)
 private_rsa_key = rsa_key
 public_rsa_key = rsa_key.publickey()
 
-# Data structure to hold transaction summary
+# Data structure to hold transaction summary, shared by all connections
 transaction_summary = {}
+summary_lock = threading.Lock()
 
 def sign_data(data, priv_key):
     h = SHA256.new(data.encode('utf-8'))
@@ -30,26 +51,37 @@ def verify_signature(data, signature_hex, pub_key):
     except (ValueError, TypeError):
         return False
 
+def encrypt_amount(amt):
+    # Raw plaintext encoding (exponent 0): the totals are products of raw
+    # ciphertexts, so only integers can be summed this way
+    if type(amt) is not int:
+        raise TypeError(f'amounts must be integers, got {type(amt).__name__}')
+    if abs(amt) > public_key.max_int:
+        raise ValueError('amount out of range for the Paillier key')
+    # g = n + 1, so g^m * r^n mod n^2 = (1 + m*n) * r^n mod n^2
+    ct = ((1 + amt * public_key.n) * noise_pool.get()) % public_key.nsquare
+    return paillier.EncryptedNumber(public_key, ct)
+
 def process_transaction(seller_name, transactions):
     # Encrypt each transaction amount and add homomorphically
     encrypted_transactions = []
     for amt in transactions:
-        enc = public_key.encrypt(amt)
+        enc = encrypt_amount(amt)
         encrypted_transactions.append(enc)
 
     # Homomorphic addition
-    encrypted_total = encrypted_transactions[0]
-    for enc_amt in encrypted_transactions[1:]:
-        encrypted_total += enc_amt
+    total_ct = aggregator.reduce(enc.ciphertext(be_secure=False) for enc in encrypted_transactions)
+    encrypted_total = paillier.EncryptedNumber(public_key, total_ct)
 
     decrypted_total = private_key.decrypt(encrypted_total)
 
-    # Save summary
-    transaction_summary[seller_name] = {
+    # This seller's summary entry; handle_request stores it
+    return {
         'individual_transaction_amounts': transactions,
-        'encrypted_transaction_amounts': [str(enc.ciphertext()) for enc in encrypted_transactions],
+        # Already obfuscated by the pooled noise, so skip phe's extra r^n
+        'encrypted_transaction_amounts': [enc.ciphertext(be_secure=False) for enc in encrypted_transactions],
         'decrypted_transaction_amounts': transactions,  # Since individual decrypted is known
-        'total_encrypted_transaction_amount': str(encrypted_total.ciphertext()),
+        'total_encrypted_transaction_amount': encrypted_total.ciphertext(),
         'total_decrypted_transaction_amount': decrypted_total,
     }
 
@@ -58,60 +90,126 @@ def prepare_summary():
     for seller, details in transaction_summary.items():
         summary += f"Seller: {seller}\n"
         summary += f"Individual Amounts: {details['individual_transaction_amounts']}\n"
-        summary += f"Encrypted Amounts: {details['encrypted_transaction_amounts']}\n"
+        summary += f"Encrypted Amounts: {[str(c) for c in details['encrypted_transaction_amounts']]}\n"
         summary += f"Total Encrypted: {details['total_encrypted_transaction_amount']}\n"
         summary += f"Total Decrypted: {details['total_decrypted_transaction_amount']}\n"
         summary += "\n"
     return summary
 
+def encode_response(response, fmt):
+    # Ciphertexts are kept as ints; JSON carries them as decimal strings,
+    # the binary format as fixed-width records
+    packer = wire.Packer()
+
+    def pack_ct(c):
+        return packer.paillier(c, public_key.n) if fmt == 'binary' else str(c)
+
+    def pack_sig(sig_hex):
+        return packer.signature(bytes.fromhex(sig_hex), public_rsa_key.n) if fmt == 'binary' else sig_hex
+
+    summary = {}
+    for seller, details in response['transaction_summary'].items():
+        details = dict(details)
+        details['encrypted_transaction_amounts'] = [pack_ct(c) for c in details['encrypted_transaction_amounts']]
+        details['total_encrypted_transaction_amount'] = pack_ct(details['total_encrypted_transaction_amount'])
+        if 'digital_signature' in details:
+            details['digital_signature'] = pack_sig(details['digital_signature'])
+        summary[seller] = details
+    meta = dict(response, transaction_summary=summary, signature=pack_sig(response['signature']), format=fmt)
+
+    if fmt == 'binary':
+        return packer.dumps(meta)
+    return json.dumps(meta).encode('utf-8')
+
+def handle_request(payload):
+    """One seller's batch -> encoded response"""
+    if not isinstance(payload, dict):
+        raise ValueError('request must be a JSON object')
+    if payload.get('op') == 'ping':
+        # Liveness check, no crypto; also lets clients time the transport alone
+        return b'{"pong": true}'
+    seller = payload.get('seller')
+    transactions = payload.get('transactions')
+    if not isinstance(seller, str):
+        raise ValueError('seller must be a string')
+    # Amounts are summed as raw Paillier plaintexts, so integers only
+    if not isinstance(transactions, list) or not all(type(amt) is int for amt in transactions):
+        raise ValueError('transactions must be a list of integer amounts')
+
+    # Process transactions (encrypt + sum); no shared state, so connections
+    # run this concurrently
+    details = process_transaction(seller, transactions)
+
+    # The lock only covers the shared summary: store this seller's entry and
+    # take a copy of the whole summary that the signature will cover
+    with summary_lock:
+        transaction_summary[seller] = details
+        summary = prepare_summary()
+        snapshot = {s: dict(d) for s, d in transaction_summary.items()}
+
+    # Sign summary with RSA private key
+    signature = sign_data(summary, private_rsa_key)
+
+    # Verify signature for demonstration
+    verification_result = verify_signature(summary, signature, public_rsa_key)
+
+    # Include signature info in final output
+    snapshot[seller]['digital_signature'] = signature
+    snapshot[seller]['signature_verification'] = verification_result
+    with summary_lock:
+        if transaction_summary.get(seller) is details:  # not replaced meanwhile
+            details['digital_signature'] = signature
+            details['signature_verification'] = verification_result
+
+    # Build response
+    response = {
+        'transaction_summary': snapshot,
+        'signature': signature,
+        'signature_verification': verification_result
+    }
+
+    # Binary if the client offered it, JSON otherwise
+    fmt = wire.negotiate(payload.get('formats'))
+    return encode_response(response, fmt)
+
+def serve_connection(conn, addr):
+    # Framed requests until the client hangs up; each response carries the
+    # request id it answers, in the order the requests arrived
+    try:
+        while True:
+            request = wire.recv_frame(conn)
+            if request is None:
+                break
+            request_id, body = request
+            try:
+                reply = handle_request(json.loads(body.decode('utf-8')))
+            except ValueError as e:  # also malformed JSON / UTF-8
+                reply = json.dumps({'error': f'bad request: {e}'}).encode('utf-8')
+            except Exception as e:
+                # Whatever went wrong, it only fails this request, not the connection
+                print(f"Request from {addr} failed: {e!r}")
+                reply = json.dumps({'error': f'server error: {e}'}).encode('utf-8')
+            wire.send_frame(conn, request_id, reply)
+    except (ConnectionError, ValueError) as e:
+        print(f"Connection from {addr} dropped: {e}")
+    finally:
+        conn.close()
+
 def main():
     host = '127.0.0.1'
     port = 65432
 
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     s.bind((host, port))
-    s.listen()
+    s.listen(128)
 
     print(f"Server listening on {host}:{port}")
 
     while True:
         conn, addr = s.accept()
         print(f"Connection from {addr}")
-
-        data = conn.recv(4096).decode('utf-8')
-        if not data:
-            conn.close()
-            continue
-
-        payload = json.loads(data)
-        seller = payload['seller']
-        transactions = payload['transactions']
-
-        # Process transactions (encrypt + sum)
-        process_transaction(seller, transactions)
-
-        # Prepare full summary text
-        summary = prepare_summary()
-
-        # Sign summary with RSA private key
-        signature = sign_data(summary, private_rsa_key)
-
-        # Verify signature for demonstration
-        verification_result = verify_signature(summary, signature, public_rsa_key)
-
-        # Include signature info in final output
-        transaction_summary[seller]['digital_signature'] = signature
-        transaction_summary[seller]['signature_verification'] = verification_result
-
-        # Build response
-        response = {
-            'transaction_summary': transaction_summary,
-            'signature': signature,
-            'signature_verification': verification_result
-        }
-
-        conn.sendall(json.dumps(response).encode('utf-8'))
-        conn.close()
+        threading.Thread(target=serve_connection, args=(conn, addr), daemon=True).start()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,137 @@
+from numtheory import powmod
+
+# Block-mode RSA for text and files.
+#
+# The message is cut into chunks of k bytes, k as large as the modulus
+# allows, and each chunk costs one modexp. A chunk is encoded as the
+# integer of 0x01 || chunk (a marker byte above the data), so short final
+# chunks and leading zero bytes survive the round trip without a length
+# header.
+# Every ciphertext block is written fixed-width, so the result is one
+# compact bytes blob and streams can be processed block by block.
+
+
+_MARKER = b'\x01'
+
+
+def text_to_int(text):
+    """Big-endian integer of a str's UTF-8 bytes (bytes are taken as they are)"""
+    data = text.encode() if isinstance(text, str) else text
+    return int.from_bytes(data, byteorder='big')
+
+def int_to_bytes(num):
+    length = (num.bit_length() + 7) // 8  # Calculate byte length
+    return num.to_bytes(length, byteorder='big')
+
+def int_to_text(num):
+    return int_to_bytes(num).decode()
+
+
+def chunk_bytes(n):
+    """Plaintext bytes per block: the marker byte's low bit above 8k data bits must stay below n"""
+    k = (n.bit_length() - 2) // 8
+    if k < 1:
+        raise ValueError('modulus too small for block encryption')
+    return k
+
+def block_width(n):
+    """Bytes per ciphertext block"""
+    return (n.bit_length() + 7) // 8
+
+
+def encrypt_chunk(chunk, pubkey):
+    e, n = pubkey
+    m = text_to_int(_MARKER + bytes(chunk))
+    return powmod(m, e, n).to_bytes(block_width(n), 'big')
+
+def decrypt_block(block, privkey):
+    d, n = privkey
+    data = int_to_bytes(powmod(text_to_int(block), d, n))
+    if data[:1] != _MARKER:
+        raise ValueError('block does not decrypt to a marked chunk')
+    return data[1:]
+
+
+def encrypt_bytes(data, pubkey):
+    k = chunk_bytes(pubkey[1])
+    return b''.join(encrypt_chunk(data[i:i + k], pubkey) for i in range(0, len(data), k))
+
+def decrypt_bytes(blob, privkey):
+    w = block_width(privkey[1])
+    if len(blob) % w:
+        raise ValueError('ciphertext is not a whole number of blocks')
+    return b''.join(decrypt_block(blob[i:i + w], privkey) for i in range(0, len(blob), w))
+
+def encrypt_text(text, pubkey):
+    return encrypt_bytes(text.encode(), pubkey)
+
+def decrypt_text(blob, privkey):
+    return decrypt_bytes(blob, privkey).decode()
+
+
+def encrypt_stream(src, dst, pubkey, blocks_per_read=256):
+    """Encrypt file object src into dst, reading blocks_per_read chunks at a time"""
+    k = chunk_bytes(pubkey[1])
+    while True:
+        data = src.read(k * blocks_per_read)
+        if not data:
+            break
+        dst.write(encrypt_bytes(data, pubkey))
+
+def decrypt_stream(src, dst, privkey, blocks_per_read=256):
+    w = block_width(privkey[1])
+    pending = b''
+    while True:
+        blob = src.read(w * blocks_per_read)
+        if not blob:
+            break
+        # Short reads (pipes, sockets) may split a block; carry the remainder
+        pending += blob
+        whole = len(pending) - len(pending) % w
+        dst.write(decrypt_bytes(pending[:whole], privkey))
+        pending = pending[whole:]
+    if pending:
+        raise ValueError('ciphertext is not a whole number of blocks')
+
+
+# ---------- Benchmark ----------
+
+def main():
+    import io
+    import os
+    import sys
+    from time import perf_counter
+    from numtheory import gcd, modinv
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lab7'))
+    from primes import generate_prime
+
+    e = 65537
+    p = q = generate_prime(1024)
+    while p == q or gcd(e, (p - 1) * (q - 1)) != 1:
+        p, q = generate_prime(1024), generate_prime(1024)
+    n = p * q
+    pubkey, privkey = (e, n), (modinv(e, (p - 1) * (q - 1)), n)
+    message = 'Transaction log line 0042: amount=1337 status=settled\n' * 200
+
+    start = perf_counter()
+    per_char = [powmod(ord(ch), e, n) for ch in message]
+    per_char_enc = perf_counter() - start
+    start = perf_counter()
+    blob = encrypt_text(message, pubkey)
+    block_enc = perf_counter() - start
+
+    src, dst, out = io.BytesIO(message.encode()), io.BytesIO(), io.BytesIO()
+    encrypt_stream(src, dst, pubkey)
+    dst.seek(0)
+    decrypt_stream(dst, out, privkey)
+    assert decrypt_text(blob, privkey) == out.getvalue().decode() == message
+
+    blocks = len(blob) // block_width(n)
+    per_char_bytes = sum(block_width(n) for _ in per_char)
+    print(f"{len(message)}-character message, 2048-bit key")
+    print(f"{'Mode':<10} {'Modexps':<10} {'Bytes':<10} {'Encrypt (ms)':<12}")
+    print(f"{'per-char':<10} {len(per_char):<10} {per_char_bytes:<10} {per_char_enc * 1000:<12.1f}")
+    print(f"{'block':<10} {blocks:<10} {len(blob):<10} {block_enc * 1000:<12.1f}")
+
+if __name__ == "__main__":
+    main()
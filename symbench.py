@@ -0,0 +1,236 @@
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import sys
+from time import perf_counter
+
+import Crypto
+from Crypto.Cipher import AES, DES
+
+# Non-interactive benchmark for the symmetric ciphers.
+#
+# Sweeps cipher x mode x payload size. Every case gets warmup runs, then
+# `repeat` timed samples; small payloads are timed in batches so each
+# sample lasts at least `min_time` seconds and timer resolution and loop
+# overhead don't dominate. Reported latency is per operation (cipher
+# context creation included). Results can be written as JSON/CSV and
+# compared against a saved JSON baseline.
+#
+#   python symbench.py --sizes 16,4K,1M --json run.json
+#   python symbench.py --baseline run.json       # exit code 1 on regression
+
+CIPHERS = {
+    'DES': (DES, 8),
+    'AES-128': (AES, 16),
+    'AES-192': (AES, 24),
+    'AES-256': (AES, 32),
+}
+MODES = ['ECB', 'CBC', 'CTR', 'GCM']
+SIZES = [16 ** i for i in range(1, 8)]  # 16 B .. 256 MB
+QUICK_SIZES = [16, 4096, 1 << 20]
+
+_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+
+def parse_size(text):
+    text = text.strip().upper().rstrip('B')
+    unit = text[-1] if text and text[-1] in _UNITS else ''
+    return int(text[:len(text) - len(unit)]) * _UNITS[unit]
+
+def format_size(size):
+    for unit in ('G', 'M', 'K'):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}B"
+    return f"{size}B"
+
+def percentile(samples, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _operations(cipher, mode, key):
+    """(encrypt, decrypt) callables over a block-aligned buffer"""
+    if mode == 'GCM':
+        nonce = os.urandom(12)
+        tags = {}
+
+        def encrypt(data):
+            ct, tags['tag'] = cipher.new(key, cipher.MODE_GCM, nonce=nonce).encrypt_and_digest(data)
+            return ct
+
+        def decrypt(data):
+            return cipher.new(key, cipher.MODE_GCM, nonce=nonce).decrypt_and_verify(data, tags['tag'])
+        return encrypt, decrypt
+
+    params = {}
+    if mode == 'CBC':
+        params['iv'] = os.urandom(cipher.block_size)
+    elif mode == 'CTR':
+        params['nonce'] = os.urandom(cipher.block_size // 2)
+    mode_id = getattr(cipher, 'MODE_' + mode)
+    return (lambda data: cipher.new(key, mode_id, **params).encrypt(data),
+            lambda data: cipher.new(key, mode_id, **params).decrypt(data))
+
+
+def _time(func, arg, warmup, repeat, min_time):
+    for _ in range(warmup):
+        func(arg)
+    # Calibrate the batch size so one sample lasts at least min_time
+    inner = 1
+    while True:
+        start = perf_counter()
+        for _ in range(inner):
+            func(arg)
+        elapsed = perf_counter() - start
+        if elapsed >= min_time:
+            break
+        inner *= 2 if elapsed == 0 else max(2, min(10, math.ceil(min_time / elapsed)))
+    samples = [elapsed / inner]
+    for _ in range(repeat - 1):
+        start = perf_counter()
+        for _ in range(inner):
+            func(arg)
+        samples.append((perf_counter() - start) / inner)
+    return samples
+
+
+def run(ciphers=None, modes=None, sizes=None, warmup=2, repeat=7, min_time=0.01, progress=None):
+    """Run the sweep and return a list of result dicts"""
+    ciphers = ciphers or list(CIPHERS)
+    modes = modes or MODES
+    sizes = sorted(sizes or SIZES)
+    payload = memoryview(os.urandom(max(sizes)))
+    results = []
+    for name in ciphers:
+        cipher, key_len = CIPHERS[name]
+        key = os.urandom(key_len)
+        for mode in modes:
+            if mode == 'GCM' and cipher.block_size != 16:
+                continue  # GCM needs a 128-bit block cipher
+            encrypt, decrypt = _operations(cipher, mode, key)
+            for size in sizes:
+                data = payload[:size - size % cipher.block_size]
+                ct = encrypt(data)
+                for op, func, arg in (('encrypt', encrypt, data), ('decrypt', decrypt, ct)):
+                    samples = _time(func, arg, warmup, repeat, min_time)
+                    median = percentile(samples, 50)
+                    result = {
+                        'cipher': name, 'mode': mode, 'size': size, 'op': op,
+                        'median_us': median * 1e6,
+                        'p95_us': percentile(samples, 95) * 1e6,
+                        'mb_s': size / median / 1e6,
+                        'samples': len(samples),
+                    }
+                    results.append(result)
+                    if progress:
+                        progress(result)
+    return results
+
+
+# ---------- Output / baseline ----------
+
+FIELDS = ['cipher', 'mode', 'size', 'op', 'median_us', 'p95_us', 'mb_s', 'samples']
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pycryptodome': Crypto.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+def write_json(path, results):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+def write_csv(path, results):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+def _key(result):
+    return (result['cipher'], result['mode'], result['size'], result['op'])
+
+def compare(results, baseline, threshold=0.10):
+    """Rows (result, baseline MB/s, ratio) for every case also in the baseline,
+    and the subset slower than baseline by more than `threshold`"""
+    previous = {_key(r): r for r in baseline}
+    rows, regressions = [], []
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        ratio = result['mb_s'] / old['mb_s']
+        rows.append((result, old['mb_s'], ratio))
+        if ratio < 1 - threshold:
+            regressions.append((result, old['mb_s'], ratio))
+    return rows, regressions
+
+
+def print_header():
+    print(f"{'Cipher':<8} {'Mode':<4} {'Size':>7} {'Op':<7} {'Median (us)':>12} {'p95 (us)':>12} {'MB/s':>10}")
+
+def print_result(r):
+    print(f"{r['cipher']:<8} {r['mode']:<4} {format_size(r['size']):>7} {r['op']:<7} "
+          f"{r['median_us']:>12.2f} {r['p95_us']:>12.2f} {r['mb_s']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DES/AES across modes and payload sizes")
+    parser.add_argument('--ciphers', default=','.join(CIPHERS), help="comma-separated, default: all")
+    parser.add_argument('--modes', default=','.join(MODES), help="comma-separated, default: all")
+    parser.add_argument('--sizes', help="comma-separated, e.g. 16,4K,1M (default 16B..256MB)")
+    parser.add_argument('--quick', action='store_true', help="sizes 16B, 4KB, 1MB only")
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.01, help="seconds per sample")
+    parser.add_argument('--json', help="write results to this JSON file")
+    parser.add_argument('--csv', help="write results to this CSV file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed slowdown vs baseline")
+    args = parser.parse_args(argv)
+
+    if args.sizes:
+        sizes = [parse_size(s) for s in args.sizes.split(',')]
+    else:
+        sizes = QUICK_SIZES if args.quick else SIZES
+    ciphers = [c.strip().upper() for c in args.ciphers.split(',')]
+    modes = [m.strip().upper() for m in args.modes.split(',')]
+    for name in ciphers:
+        if name not in CIPHERS:
+            parser.error(f"unknown cipher {name}")
+    for mode in modes:
+        if mode not in MODES:
+            parser.error(f"unknown mode {mode}")
+
+    print_header()
+    results = run(ciphers, modes, sizes, args.warmup, args.repeat, args.min_time, progress=print_result)
+    if args.json:
+        write_json(args.json, results)
+    if args.csv:
+        write_csv(args.csv, results)
+
+    if args.baseline:
+        rows, regressions = compare(results, load_results(args.baseline), args.threshold)
+        print(f"\nAgainst baseline {args.baseline} ({len(rows)} matching cases):")
+        for result, old, ratio in rows:
+            flag = '  REGRESSION' if ratio < 1 - args.threshold else ''
+            print(f"{result['cipher']:<8} {result['mode']:<4} {format_size(result['size']):>7} "
+                  f"{result['op']:<7} {old:>10.1f} -> {result['mb_s']:>10.1f} MB/s ({ratio:.2f}x){flag}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
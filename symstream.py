@@ -0,0 +1,179 @@
+import base64
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+
+# Chunked, constant-memory DES/AES file encryption.
+#
+# The source is read chunk_size bytes at a time (file objects, mmaps or any
+# bytes-like object) and pushed through a single cipher context, so CBC
+# chaining carries across chunks and the output is byte-identical to
+# encrypting the whole input at once: IV || ciphertext with PKCS#7 padding
+# (no IV in ECB mode). Optional base64 is streamed as well, matching
+# base64.b64encode(iv + ciphertext). Peak memory is about two chunks
+# whatever the input size.
+
+CHUNK_SIZE = 1 << 20
+
+
+def _chunks(src, chunk_size):
+    """Yield chunks of a file object, or memoryview slices of a bytes-like/mmap input"""
+    if hasattr(src, 'read'):
+        while True:
+            data = src.read(chunk_size)
+            if not data:
+                return
+            yield data
+    else:
+        view = memoryview(src)
+        for i in range(0, len(view), chunk_size):
+            yield view[i:i + chunk_size]
+
+
+# ---------- Streaming base64 ----------
+
+class Base64Writer:
+    """Base64-encodes everything written to it into the binary file `dst`.
+
+    Data is encoded in multiples of 3 bytes and the remainder carried to
+    the next write; close() flushes it (and leaves dst open).
+    """
+    def __init__(self, dst):
+        self.dst = dst
+        self._rest = b''
+
+    def write(self, data):
+        if self._rest:
+            data = self._rest + bytes(data)
+        whole = len(data) - len(data) % 3
+        if whole:
+            self.dst.write(base64.b64encode(data[:whole]))
+        self._rest = bytes(data[whole:])
+        return len(data)
+
+    def close(self):
+        self.dst.write(base64.b64encode(self._rest))
+        self._rest = b''
+
+
+def b64decode_chunks(chunks):
+    """Decode a stream of base64 chunks; whitespace and line breaks are skipped"""
+    rest = b''
+    for data in chunks:
+        data = rest + bytes(data).translate(None, b' \t\r\n')
+        whole = len(data) - len(data) % 4
+        if whole:
+            yield base64.b64decode(data[:whole])
+        rest = data[whole:]
+    if rest:
+        raise ValueError('truncated base64 input')
+
+
+# ---------- Encrypt / decrypt ----------
+
+def encrypt_stream(src, dst, key, cipher=AES, mode=None, chunk_size=CHUNK_SIZE, b64=False):
+    """Encrypt src into the binary file dst as IV || ciphertext (CBC by default)"""
+    mode = cipher.MODE_CBC if mode is None else mode
+    block = cipher.block_size
+    chunk_size = max(block, chunk_size - chunk_size % block)
+    ctx = cipher.new(key, mode)
+    out = Base64Writer(dst) if b64 else dst
+
+    out.write(getattr(ctx, 'iv', b''))
+    # One output buffer reused for every chunk
+    buf = memoryview(bytearray(chunk_size + block))
+    tail = b''
+    for data in _chunks(src, chunk_size):
+        if tail:
+            data = tail + bytes(data)  # short read left a partial block
+        whole = len(data) - len(data) % block
+        if whole:
+            ctx.encrypt(data[:whole], output=buf[:whole])
+            out.write(buf[:whole])
+        tail = bytes(data[whole:])
+    out.write(ctx.encrypt(pad(tail, block)))
+    if b64:
+        out.close()
+
+def decrypt_stream(src, dst, key, cipher=AES, mode=None, chunk_size=CHUNK_SIZE, b64=False):
+    """Inverse of encrypt_stream; the last block is held back until EOF for unpadding"""
+    mode = cipher.MODE_CBC if mode is None else mode
+    block = cipher.block_size
+    chunk_size = max(block, chunk_size - chunk_size % block)
+    chunks = _chunks(src, chunk_size)
+    if b64:
+        chunks = b64decode_chunks(chunks)
+
+    ctx = cipher.new(key, mode) if mode == cipher.MODE_ECB else None
+    buf = memoryview(bytearray(chunk_size + block))
+    pending = b''
+    for data in chunks:
+        pending = pending + bytes(data) if pending else data
+        if ctx is None:
+            if len(pending) < block:
+                pending = bytes(pending)
+                continue
+            ctx = cipher.new(key, mode, bytes(pending[:block]))
+            pending = pending[block:]
+        whole = len(pending) - len(pending) % block
+        if whole == len(pending):
+            whole -= block
+        if whole > 0:
+            # b64 chunks may exceed chunk_size; keep buf-sized pieces
+            for i in range(0, whole, len(buf)):
+                n = min(len(buf), whole - i)
+                ctx.decrypt(pending[i:i + n], output=buf[:n])
+                dst.write(buf[:n])
+            pending = bytes(pending[whole:])
+        else:
+            pending = bytes(pending)
+
+    if ctx is None or len(pending) != block:
+        raise ValueError('ciphertext is not a whole number of blocks')
+    dst.write(unpad(ctx.decrypt(pending), block))
+
+
+def encrypt_file(src_path, dst_path, key, **kwargs):
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        encrypt_stream(src, dst, key, **kwargs)
+
+def decrypt_file(src_path, dst_path, key, **kwargs):
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        decrypt_stream(src, dst, key, **kwargs)
+
+
+# ---------- Benchmark ----------
+
+def main():
+    import io
+    import os
+    import tracemalloc
+    from time import perf_counter
+
+    size = 64 << 20
+    data = os.urandom(size)
+    key = os.urandom(16)
+
+    def whole_buffer():
+        ctx = AES.new(key, AES.MODE_CBC)
+        return base64.b64encode(ctx.iv + ctx.encrypt(pad(data, AES.block_size)))
+
+    class Sink:
+        """Discards output, so only the encryptor's own memory is measured"""
+        def write(self, b):
+            return len(b)
+
+    print(f"{size >> 20} MB input, AES-128-CBC + base64")
+    print(f"{'Mode':<10} {'Peak MB':<10} {'MB/s':<10}")
+    for name, run in [('buffer', whole_buffer),
+                      ('stream', lambda: encrypt_stream(io.BytesIO(data), Sink(), key, b64=True))]:
+        tracemalloc.start()
+        start = perf_counter()
+        run()
+        seconds = perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:<10} {peak / 2 ** 20:<10.1f} {size / seconds / 1e6:<10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import struct
+from functools import lru_cache
+
+# Compact binary wire format for ciphertexts and signatures.
+#
+# Message:  MAGIC | meta length (4 bytes) | meta JSON | record count (4 bytes) | records
+# Record:   type (1 byte) | key id (4 bytes) | width (2 bytes) | count (1 byte) |
+#           count fixed-width big-endian integers of `width` bytes each
+#
+# The meta JSON carries everything that isn't a big number; each ciphertext
+# or signature in it is replaced by {"$r": index} pointing at a record.
+# Peers that don't ask for "binary" keep getting plain JSON.
+
+MAGIC = b'ISW1'
+FORMATS = ['binary', 'json']
+
+PAILLIER, ELGAMAL, SIGNATURE = 1, 2, 3
+
+_HEADER = struct.Struct('>B4sHB')
+
+
+def key_id(modulus):
+    """4-byte key identifier: SHA-256 prefix of the key's modulus"""
+    return hashlib.sha256(modulus.to_bytes((modulus.bit_length() + 7) // 8, 'big')).digest()[:4]
+
+def byte_width(modulus):
+    return (modulus.bit_length() + 7) // 8
+
+# A message packs many values under the same key, so the key id (a SHA-256)
+# and the record width are worked out once per modulus
+
+@lru_cache(maxsize=64)
+def _layout(modulus):
+    return key_id(modulus), byte_width(modulus)
+
+@lru_cache(maxsize=64)
+def _paillier_layout(n):
+    return key_id(n), byte_width(n * n)
+
+def negotiate(offered):
+    """Pick the first format we support from the peer's list (JSON if none)"""
+    for fmt in offered or []:
+        if fmt in FORMATS:
+            return fmt
+    return 'json'
+
+def is_binary(data):
+    return data[:len(MAGIC)] == MAGIC
+
+
+# ---------- Records ----------
+
+def encode_record(rtype, kid, width, values):
+    return _HEADER.pack(rtype, kid, width, len(values)) + b''.join(v.to_bytes(width, 'big') for v in values)
+
+def decode_record(data, pos=0):
+    """Returns ((type, key id, values), next position)"""
+    rtype, kid, width, count = _HEADER.unpack_from(data, pos)
+    pos += _HEADER.size
+    values = []
+    for _ in range(count):
+        values.append(int.from_bytes(data[pos:pos + width], 'big'))
+        pos += width
+    return (rtype, kid, values), pos
+
+
+# ---------- Messages ----------
+
+class Packer:
+    """Collects records while the caller builds the meta dict"""
+    def __init__(self):
+        self.records = []
+
+    def _add(self, record):
+        self.records.append(record)
+        return {'$r': len(self.records) - 1}
+
+    def paillier(self, c, n):
+        """Paillier ciphertext under modulus n (stored mod n^2)"""
+        return self._add(encode_record(PAILLIER, *_paillier_layout(n), [c]))
+
+    def elgamal(self, ct, p):
+        return self._add(encode_record(ELGAMAL, *_layout(p), list(ct)))
+
+    def signature(self, sig, n):
+        """RSA signature bytes under modulus n"""
+        value = int.from_bytes(sig, 'big')
+        return self._add(encode_record(SIGNATURE, *_layout(n), [value]))
+
+    def dumps(self, meta):
+        meta_bytes = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+        return b''.join([MAGIC, struct.pack('>I', len(meta_bytes)), meta_bytes,
+                         struct.pack('>I', len(self.records))] + self.records)
+
+
+def _resolve(obj, values):
+    if isinstance(obj, dict):
+        if len(obj) == 1 and '$r' in obj:
+            return values[obj['$r']]
+        return {k: _resolve(v, values) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_resolve(v, values) for v in obj]
+    return obj
+
+def loads(data):
+    """Decode a binary message back into the meta dict.
+
+    Paillier records become ints, ElGamal records (c1, c2) tuples and
+    signatures bytes.
+    """
+    if not is_binary(data):
+        raise ValueError('not a binary wire message')
+    pos = len(MAGIC)
+    (meta_len,) = struct.unpack_from('>I', data, pos)
+    pos += 4
+    meta = json.loads(data[pos:pos + meta_len].decode('utf-8'))
+    pos += meta_len
+    (count,) = struct.unpack_from('>I', data, pos)
+    pos += 4
+    values = []
+    for _ in range(count):
+        start = pos
+        (rtype, kid, ints), pos = decode_record(data, pos)
+        if rtype == PAILLIER:
+            values.append(ints[0])
+        elif rtype == ELGAMAL:
+            values.append(tuple(ints))
+        else:
+            width = _HEADER.unpack_from(data, start)[2]
+            values.append(ints[0].to_bytes(width, 'big'))
+    return _resolve(meta, values)
+
+
+# ---------- Framing ----------
+#
+# Frame:  body length (4 bytes) | request id (4 bytes) | body
+#
+# A connection carries any number of frames in each direction. Responses
+# reuse the request id of the request they answer, so a client can send
+# several requests before reading any response.
+
+_FRAME = struct.Struct('>II')
+MAX_FRAME = 64 << 20
+
+
+def frame(request_id, body):
+    return _FRAME.pack(len(body), request_id) + body
+
+def _recv_exactly(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    pos = 0
+    while pos < size:
+        got = sock.recv_into(view[pos:])
+        if not got:
+            if pos:
+                raise ConnectionError('connection closed mid-frame')
+            return None
+        pos += got
+    return bytes(buf)
+
+def send_frame(sock, request_id, body):
+    sock.sendall(frame(request_id, body))
+
+def recv_frame(sock):
+    """(request id, body), or None if the peer closed between frames"""
+    header = _recv_exactly(sock, _FRAME.size)
+    if header is None:
+        return None
+    size, request_id = _FRAME.unpack(header)
+    if size > MAX_FRAME:
+        raise ValueError(f'frame of {size} bytes exceeds {MAX_FRAME}')
+    body = _recv_exactly(sock, size) if size else b''
+    if body is None:
+        raise ConnectionError('connection closed mid-frame')
+    return request_id, body
+
+
+# ---------- Benchmark ----------
+
+def main():
+    import random
+    from time import perf_counter
+
+    n = random.getrandbits(3072) | (1 << 3071) | 1  # phe's default key size
+    n_sq = n * n
+    ciphertexts = [random.randrange(n_sq) for _ in range(2000)]
+
+    start = perf_counter()
+    json_payload = json.dumps({'cts': [str(c) for c in ciphertexts]}).encode('utf-8')
+    json_enc = perf_counter() - start
+    start = perf_counter()
+    json_back = [int(c) for c in json.loads(json_payload)['cts']]
+    json_dec = perf_counter() - start
+
+    start = perf_counter()
+    packer = Packer()
+    bin_payload = packer.dumps({'cts': [packer.paillier(c, n) for c in ciphertexts]})
+    bin_enc = perf_counter() - start
+    start = perf_counter()
+    bin_back = loads(bin_payload)['cts']
+    bin_dec = perf_counter() - start
+
+    assert json_back == bin_back == ciphertexts
+    count = len(ciphertexts)
+    print(f"{count} Paillier ciphertexts, {n.bit_length()}-bit n")
+    print(f"{'Format':<8} {'Bytes':<12} {'Encode ct/s':<14} {'Decode ct/s':<14}")
+    print(f"{'json':<8} {len(json_payload):<12} {count / json_enc:<14,.0f} {count / json_dec:<14,.0f}")
+    print(f"{'binary':<8} {len(bin_payload):<12} {count / bin_enc:<14,.0f} {count / bin_dec:<14,.0f}")
+
+if __name__ == "__main__":
+    main()